@@ -0,0 +1,390 @@
+"""Performance benchmarks for the simulator, the agent and full training episodes.
+
+Usage:
+    python benchmarks/run_benchmarks.py                      # run all, print table
+    python benchmarks/run_benchmarks.py -o results.json      # also write JSON
+    python benchmarks/run_benchmarks.py --compare base.json  # flag slowdowns vs an earlier run
+    python benchmarks/run_benchmarks.py --only env_step_random agent_update
+
+Metric names ending in _per_sec are higher-is-better; everything else
+(_us, _ms, _mb) is lower-is-better.
+
+Each benchmark runs in a fresh interpreter (so peak_rss_mb is its own peak,
+not the highest of everything that ran before it), --repeat times, and the
+median of each metric is reported. Repeats are interleaved (one round over all
+benchmarks, then the next) so a slow spell on the machine doesn't hit every
+sample of one benchmark. --compare only flags slowdowns larger than both the
+threshold and the run-to-run spread measured in either run.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mario_config import *
+from mario_sim import MarioSim
+from mario_agent import QLearningAgent
+
+SEED = 1234
+LEVEL_SEED = 0
+
+# Fixed action script: run right, jump regularly (reaches the goal on the default layouts)
+SCRIPTED_ACTIONS = [2, 2, 2, 4, 4, 4, 4, 4, 2, 2, 4, 0]
+
+
+def _best_of(repeat, fn):
+    """Run fn() `repeat` times and return the fastest (elapsed, result)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[0]:
+            best = (elapsed, result)
+    return best
+
+
+def _policy_agent():
+    """Agent loaded from the trained checkpoint, or None if there isn't one"""
+    for filename in ('q_table.qtb', 'q_table.json'):
+        path = os.path.join(ROOT, filename)
+        if os.path.exists(path):
+            agent = QLearningAgent()
+            agent.load_q_table(path, read_only=True)
+            return agent
+    return None
+
+
+def _run_steps(game, choose_action, num_steps):
+    steps = 0
+    state = game.reset()
+    while steps < num_steps:
+        state, _, done = game.step(choose_action(state, steps))
+        steps += 1
+        if done:
+            state = game.reset()
+    return steps
+
+
+def bench_env_step_scripted(scale):
+    game = MarioSim(quiet=True, level_seed=LEVEL_SEED)
+    num_steps = 20000 * scale
+    elapsed, steps = _best_of(3, lambda: _run_steps(
+        game, lambda state, i: SCRIPTED_ACTIONS[i % len(SCRIPTED_ACTIONS)], num_steps))
+    return {'steps_per_sec': steps / elapsed, 'step_us': elapsed / steps * 1e6}
+
+
+def bench_env_step_random(scale):
+    game = MarioSim(quiet=True, level_seed=LEVEL_SEED)
+    num_steps = 20000 * scale
+
+    def run():
+        rng = random.Random(SEED)
+        return _run_steps(game, lambda state, i: rng.randrange(NUM_ACTIONS), num_steps)
+
+    elapsed, steps = _best_of(3, run)
+    return {'steps_per_sec': steps / elapsed, 'step_us': elapsed / steps * 1e6}
+
+
+def bench_env_step_policy(scale):
+    agent = _policy_agent()
+    if agent is None:
+        return None
+    game = MarioSim(quiet=True, level_seed=LEVEL_SEED, encode_states=True)
+    num_steps = 20000 * scale
+
+    def run():
+        agent.rng.seed(SEED)
+        return _run_steps(game, lambda state, i: agent.get_action(state, explore=False), num_steps)
+
+    elapsed, steps = _best_of(3, run)
+    return {'steps_per_sec': steps / elapsed, 'step_us': elapsed / steps * 1e6}
+
+
+def bench_long_level(scale):
+    from mario_level import get_level, clear_level_cache
+    # About 100x the length of a default level 3
+    num_patterns = 100 * LEVEL_PARAMS[3]['num_patterns']
+
+    def build():
+        clear_level_cache()
+        return get_level(3, LEVEL_SEED, quiet=True, num_patterns=num_patterns)
+
+    build_elapsed, _ = _best_of(3, build)
+    game = MarioSim(quiet=True, level_id=3, level_seed=LEVEL_SEED, num_patterns=num_patterns)
+    num_steps = 20000 * scale
+
+    def run():
+        rng = random.Random(SEED)
+        return _run_steps(game, lambda state, i: rng.choice((2, 2, 4)), num_steps)
+
+    elapsed, steps = _best_of(3, run)
+    return {'level_build_ms': build_elapsed * 1e3, 'steps_per_sec': steps / elapsed}
+
+
+def bench_get_state(scale):
+    game = MarioSim(quiet=True, level_seed=LEVEL_SEED)
+    # Sample positions along the whole level so the lookups see every section
+    positions = [100 + i * 7 for i in range(int(game.goal_x - 100) // 7)]
+    calls = len(positions) * 10 * scale
+
+    def run():
+        for _ in range(10 * scale):
+            for x in positions:
+                game.player_x = x
+                game._get_state()
+
+    elapsed, _ = _best_of(3, run)
+    return {'call_us': elapsed / calls * 1e6}
+
+
+def bench_snapshot_restore(scale):
+    game = MarioSim(quiet=True, level_seed=LEVEL_SEED)
+    for i in range(200):
+        game.step(SCRIPTED_ACTIONS[i % len(SCRIPTED_ACTIONS)])
+    snapshot = game.get_snapshot()
+    calls = 20000 * scale
+
+    def run():
+        for _ in range(calls):
+            game.restore_snapshot(snapshot)
+            game.get_snapshot()
+
+    elapsed, _ = _best_of(3, run)
+    return {'clones_per_sec': calls / elapsed}
+
+
+def bench_agent_get_action(scale):
+    agent = _policy_agent() or QLearningAgent()
+    rng = random.Random(SEED)
+    states = [rng.randrange(len(agent.q_table)) for _ in range(1000)]
+    calls = len(states) * 50 * scale
+
+    def run():
+        agent.rng.seed(SEED)
+        for _ in range(50 * scale):
+            for state in states:
+                agent.get_action(state, explore=False)
+
+    elapsed, _ = _best_of(3, run)
+    return {'call_us': elapsed / calls * 1e6}
+
+
+def bench_policy_get_action(scale):
+    from mario_policy import FrozenPolicy
+    policy = FrozenPolicy.from_agent(_policy_agent() or QLearningAgent())
+    rng = random.Random(SEED)
+    states = [rng.randrange(len(policy.actions)) for _ in range(1000)]
+    calls = len(states) * 50 * scale
+
+    def run():
+        for _ in range(50 * scale):
+            for state in states:
+                policy.get_action(state, explore=False)
+
+    elapsed, _ = _best_of(3, run)
+    return {'call_us': elapsed / calls * 1e6}
+
+
+def bench_agent_update(scale):
+    agent = QLearningAgent()
+    rng = random.Random(SEED)
+    transitions = [(rng.randrange(len(agent.q_table)), rng.randrange(NUM_ACTIONS), rng.uniform(-1, 1),
+                    rng.randrange(len(agent.q_table)), rng.random() < 0.01) for _ in range(1000)]
+    calls = len(transitions) * 50 * scale
+
+    def run():
+        for _ in range(50 * scale):
+            for state, action, reward, next_state, done in transitions:
+                agent.update_q_value(state, action, reward, next_state, done)
+
+    elapsed, _ = _best_of(3, run)
+    return {'call_us': elapsed / calls * 1e6}
+
+
+def bench_train_episode(scale, trace_lambda=0.0):
+    game = MarioSim(quiet=True, level_seed=LEVEL_SEED, encode_states=True)
+    episodes = 20 * scale
+
+    def run():
+        agent = QLearningAgent(seed=SEED, trace_lambda=trace_lambda)
+        steps = 0
+        for _ in range(episodes):
+            steps += agent.run_episode(game)['steps']
+            agent.decay_epsilon()
+        return steps
+
+    elapsed, steps = _best_of(3, run)
+    return {'episodes_per_sec': episodes / elapsed, 'episode_ms': elapsed / episodes * 1e3,
+            'steps_per_sec': steps / elapsed}
+
+
+def bench_train_episode_lambda(scale):
+    return bench_train_episode(scale, trace_lambda=TRACE_LAMBDA)
+
+
+def bench_vec_env_step(scale):
+    try:
+        from mario_vec_env import VectorMarioEnv
+    except ImportError:
+        return None
+    import numpy as np
+    num_envs = 1024
+    env = VectorMarioEnv(num_envs, level_seed=LEVEL_SEED)
+    rng = np.random.default_rng(SEED)
+    actions = rng.integers(0, NUM_ACTIONS, size=(50 * scale, num_envs))
+
+    def run():
+        for batch in actions:
+            env.step(batch)
+
+    elapsed, _ = _best_of(3, run)
+    return {'steps_per_sec': actions.size / elapsed}
+
+
+BENCHMARKS = {
+    'env_step_scripted': bench_env_step_scripted,
+    'env_step_random': bench_env_step_random,
+    'env_step_policy': bench_env_step_policy,
+    'long_level': bench_long_level,
+    'get_state': bench_get_state,
+    'snapshot_restore': bench_snapshot_restore,
+    'agent_get_action': bench_agent_get_action,
+    'policy_get_action': bench_policy_get_action,
+    'agent_update': bench_agent_update,
+    'train_episode': bench_train_episode,
+    'train_episode_lambda': bench_train_episode_lambda,
+    'vec_env_step': bench_vec_env_step,
+}
+
+
+def _peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _run_one(name, scale):
+    """Run one benchmark in this process; returns its metrics (None if skipped) with the process peak RSS"""
+    metrics = BENCHMARKS[name](scale)
+    if metrics is not None:
+        metrics['peak_rss_mb'] = _peak_rss_mb()
+    return metrics
+
+
+def _run_isolated(name, scale):
+    """Run one benchmark in a fresh interpreter"""
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', name, '--scale', str(scale)],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    # The metrics are the last line; anything before it is the benchmark's own output
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_benchmarks(names, scale=1, repeat=5):
+    runs = {name: [] for name in names}
+    for _ in range(repeat):
+        for name in names:
+            runs[name].append(_run_isolated(name, scale))
+
+    results = {}
+    noise = {}
+    for name in names:
+        if runs[name][0] is None:
+            print(f"{name:<22} skipped")
+            continue
+        metrics = {key: statistics.median(run[key] for run in runs[name]) for key in runs[name][0]}
+        # Relative spread between the fastest and slowest run of each metric
+        noise[name] = {key: (max(run[key] for run in runs[name]) - min(run[key] for run in runs[name])) / value
+                       for key, value in metrics.items() if value}
+        results[name] = metrics
+        print(f"{name:<22} " + "  ".join(f"{key}={value:,.2f}" for key, value in metrics.items()))
+    return {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'scale': scale,
+        'repeat': repeat,
+        'results': results,
+        'noise': noise,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Print per-metric changes vs a baseline run; returns the regressions beyond threshold and run-to-run noise"""
+    regressions = []
+    print(f"\n{'Benchmark':<22}{'Metric':<18}{'Baseline':>14}{'Current':>14}{'Change':>10}{'Noise':>8}")
+    print("-" * 86)
+    for name, metrics in current['results'].items():
+        base_metrics = baseline.get('results', {}).get(name)
+        if not base_metrics:
+            continue
+        for key, value in metrics.items():
+            base = base_metrics.get(key)
+            if not base or key == 'peak_rss_mb':
+                continue
+            higher_is_better = key.endswith('_per_sec')
+            # Positive slowdown means worse than the baseline
+            slowdown = (base - value) / base if higher_is_better else (value - base) / base
+            noise = max(baseline.get('noise', {}).get(name, {}).get(key, 0),
+                        current.get('noise', {}).get(name, {}).get(key, 0))
+            flag = ''
+            if slowdown > max(threshold, noise):
+                flag = '  SLOWER'
+                regressions.append((name, key, slowdown))
+            print(f"{name:<22}{key:<18}{base:>14,.2f}{value:>14,.2f}{-slowdown:>+10.1%}{noise:>8.0%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mario RL performance benchmarks")
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument('-o', '--output', help="write results as JSON to this file")
+    parser.add_argument('--compare', metavar='BASELINE', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="fractional slowdown that counts as a regression (default 0.10)")
+    parser.add_argument('--scale', type=int, default=1, help="multiply the work per benchmark")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="runs per benchmark, each in a fresh process; the median is reported (default 5)")
+    parser.add_argument('--child', choices=sorted(BENCHMARKS), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(_run_one(args.child, args.scale)))
+        return
+
+    results = run_benchmarks(args.only or list(BENCHMARKS), args.scale, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n Results saved: {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"\n {len(regressions)} metric(s) slower than baseline by more than {args.threshold:.0%} and the noise")
+            sys.exit(1)
+        print("\n No regressions")
+
+
+if __name__ == "__main__":
+    main()
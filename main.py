@@ -1,10 +1,79 @@
-import pygame
+import argparse
+import contextlib
+import os
+import random
 import sys
-from mario_env import MarioGame
-from mario_agent import QLearningAgent
-import json
+from mario_config import TRAINING_DEFAULTS, SAVE_FILES, CLASSIC_LEVEL, TRACE_LAMBDA
 
-def main():
+# Everything else is imported inside the command that needs it, so short
+# headless jobs (eval --headless, replay --list) never pay for pygame.
+
+
+def _model_file(model_file):
+    if not os.path.exists(model_file) and model_file == "q_table.qtb" and os.path.exists("q_table.json"):
+        # Older runs saved JSON; convert with: python mario_checkpoint.py q_table.json
+        return "q_table.json"
+    return model_file
+
+
+def load_agent(model_file="q_table.qtb"):
+    """Load a trained Q-table read-only, falling back to an older q_table.json"""
+    from mario_agent import QLearningAgent
+    agent = QLearningAgent()
+    agent.load_q_table(_model_file(model_file), read_only=True)
+    return agent
+
+
+def load_policy(model_file="q_table.qtb"):
+    """Frozen greedy policy from a .pol file or compiled from a Q-table (see mario_policy)"""
+    import mario_policy
+    return mario_policy.load_policy(_model_file(model_file))
+
+
+def train(episodes=3000, workers=1, seed=None, level_id=CLASSIC_LEVEL, early_stop=False,
+          output="q_table.qtb", stats_file="training_stats.bin", record=None, trace_lambda=0.0,
+          hogwild=False):
+    """Train a fresh agent on one level and save its Q-table; returns (agent, training stats)"""
+    from mario_sim import MarioSim
+    from mario_agent import QLearningAgent
+    from mario_stats import StatsWriter
+    from mario_convergence import ConvergenceMonitor
+
+    # One seed fixes the whole run: the env and agent get their own streams from it
+    seeder = random.Random(seed)
+    sim_seed, agent_seed = (seeder.getrandbits(64), seeder.getrandbits(64)) if seed is not None else (None, None)
+    agent = QLearningAgent(seed=agent_seed, trace_lambda=trace_lambda)
+    stop_when = ConvergenceMonitor(agent) if early_stop else None
+
+    # Per-episode stats (and optionally trajectories) are streamed to disk as training runs
+    recorder = None
+    if record:
+        from mario_replay import TrajectoryWriter
+        recorder = TrajectoryWriter(record)
+    try:
+        with StatsWriter(stats_file) as stats_writer:
+            if workers > 1 and hogwild:
+                from mario_hogwild import HogwildTrainer
+                trainer = HogwildTrainer(agent, num_workers=workers, seed=seed, level_id=level_id)
+                stats = trainer.train(episodes, stats_writer=stats_writer, recorder=recorder, stop_when=stop_when)
+            elif workers > 1:
+                from mario_parallel import ParallelTrainer
+                trainer = ParallelTrainer(agent, num_workers=workers, seed=seed, level_id=level_id)
+                stats = trainer.train(episodes, stats_writer=stats_writer, recorder=recorder, stop_when=stop_when)
+            else:
+                game = MarioSim(quiet=True, level_id=level_id, encode_states=True, seed=sim_seed)
+                stats = agent.train(game, episodes, stats_writer=stats_writer, recorder=recorder,
+                                    stop_when=stop_when)
+    finally:
+        if recorder is not None:
+            recorder.close()
+
+    agent.save_q_table(output)
+    return agent, stats
+
+
+def interactive():
+    """The original menu-driven launcher (used when main.py is run without arguments)"""
     print("=" * 70)
     print("MARIO RL - EASY COIN COLLECTION ADVENTURE")
     print("=" * 70)
@@ -22,13 +91,18 @@ def main():
     print("1. Human Play Mode")
     print("2. AI Train Mode")
     print("3. AI Test Mode")
+    print("4. AI Curriculum Training (levels 1-3)")
     print("=" * 70)
-    
-    mode = input("Enter mode (1/2/3): ").strip()
-    
-    pygame.init()
-    game = MarioGame()
-    
+
+    mode = input("Enter mode (1/2/3/4): ").strip()
+
+    if mode in ("1", "3"):
+        # Only the interactive modes need a window; training stays headless
+        import pygame
+        from mario_env import MarioGame
+        pygame.init()
+        game = MarioGame()
+
     if mode == "1":
         # Human play mode
         print("\n" + "="*70)
@@ -47,13 +121,15 @@ def main():
         print("\n" + "="*70)
         input("Press ENTER to start...")
         game.run_human()
-        
+
     elif mode == "2":
         # AI training mode
         episodes = int(input("\nEnter number of training episodes (default 3000): ") or "3000")
-        
-        agent = QLearningAgent()
-        
+        workers = int(input("Enter number of worker processes (default 1): ") or "1")
+        record = input("Record every episode for replay? (y/N): ").strip().lower() == "y"
+        early_stop = input("Stop early once training converges? (Y/n): ").strip().lower() != "n"
+        traces = input(f"Use Q(lambda) eligibility traces, lambda={TRACE_LAMBDA}? (y/N): ").strip().lower() == "y"
+
         print(f"\n{'='*70}")
         print(f"TRAINING AI AGENT")
         print(f"{'='*70}")
@@ -63,30 +139,28 @@ def main():
         print("  • Collect coins strategically")
         print("  • Optimize completion time")
         print(f"\n{'='*70}\n")
-        
-        training_stats = agent.train(game, episodes)
-        
-        # Save training data
-        agent.save_q_table("q_table.json")
-        with open("training_stats.json", "w") as f:
-            json.dump(training_stats, f, indent=2)
-        
+
+        agent, _ = train(episodes, workers, early_stop=early_stop,
+                         record="training_episodes.traj" if record else None,
+                         trace_lambda=TRACE_LAMBDA if traces else 0.0)
+
         print("\n" + "="*70)
         print(" TRAINING SUMMARY")
         print("="*70)
         agent.print_policy_sample(15)
-        
+
         print(f"\n Files saved:")
-        print(f"  • q_table.json - Trained Q-table")
-        print(f"  • training_stats.json - Training statistics")
+        print(f"  • q_table.qtb - Trained Q-table")
+        print(f"  • training_stats.bin - Training statistics (load with mario_stats.load_stats)")
+        if record:
+            print(f"  • training_episodes.traj - Recorded episodes (python mario_replay.py training_episodes.traj)")
         print("="*70)
-        
+
     elif mode == "3":
         # AI test mode
         try:
-            agent = QLearningAgent()
-            agent.load_q_table("q_table.json")
-            
+            agent = load_agent()
+
             print("\n" + "="*70)
             print("AI TEST MODE")
             print("="*70)
@@ -97,21 +171,237 @@ def main():
             print("  R: Reset")
             print("  ESC: Quit")
             print("\n" + "="*70)
-            
+
             agent.print_policy_sample(5)
             print("\n" + "="*70)
             print("Starting AI playback...\n")
-            
-            game.run_ai(agent)
-            
+
+            game.run_ai(agent.freeze())
+
         except FileNotFoundError:
             print("\n Error: No trained model found!")
             print("Please run training mode first (option 2)")
             print("\nTo train: python main.py -> Select 2")
+
+    elif mode == "4":
+        # Curriculum training: levels 1 -> 3, each warm-started from the previous level's Q-table
+        from mario_agent import QLearningAgent
+        from mario_curriculum import CurriculumTrainer
+        print("\n Episode caps per level (default): " +
+              ", ".join(f"level {lvl}: {n}" for lvl, n in TRAINING_DEFAULTS['episodes_per_level'].items()))
+        episodes = int(input("Enter max episodes per level (ENTER for defaults): ") or "0")
+        workers = int(input("Enter number of worker processes (default 1): ") or "1")
+
+        agent = QLearningAgent()
+        CurriculumTrainer(agent, episodes_per_level=episodes or None, num_workers=workers).train()
+
+        print(f"\n Files saved:")
+        for level_id in (1, 2, 3):
+            print(f"  • {SAVE_FILES[f'q_table_level_{level_id}']} / {SAVE_FILES[f'stats_level_{level_id}']}")
+        print(f"  • {SAVE_FILES['q_table_all_levels']} - Final Q-table after all levels")
+        print(f"  • {SAVE_FILES['stats_all_levels']} - Per-level summary")
+        print("="*70)
     else:
         print("Invalid mode selected!")
-    
-    pygame.quit()
+
+    if mode in ("1", "3"):
+        pygame.quit()
+
+
+@contextlib.contextmanager
+def _quiet(enabled):
+    """Silence per-episode progress output (the command prints its own one-line result)"""
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def cmd_train(args):
+    if args.hogwild and args.curriculum:
+        print(" --hogwild doesn't work with --curriculum")
+        sys.exit(2)
+    if args.hogwild and args.workers < 2:
+        print(" --hogwild needs at least 2 workers (-w N)")
+        sys.exit(2)
+    if args.curriculum:
+        from mario_agent import QLearningAgent
+        from mario_curriculum import CurriculumTrainer
+        # Same seeding as train(): separate agent and environment streams from one seed
+        seeder = random.Random(args.seed)
+        agent_seed, env_seed = ((seeder.getrandbits(64), seeder.getrandbits(64)) if args.seed is not None
+                                else (None, None))
+        recorder = None
+        if args.record:
+            from mario_replay import TrajectoryWriter
+            recorder = TrajectoryWriter(args.record)
+        try:
+            with _quiet(args.quiet):
+                agent = QLearningAgent(seed=agent_seed, trace_lambda=args.trace_lambda)
+                results = CurriculumTrainer(agent, episodes_per_level=args.episodes, early_stop=args.early_stop,
+                                            num_workers=args.workers, seed=env_seed, output=args.output,
+                                            stats_file=args.stats, recorder=recorder).train()
+        finally:
+            if recorder is not None:
+                recorder.close()
+        for r in results:
+            print(f"level {r['level_id']}: {r['total_episodes']} episodes, win rate {r['final_win_rate']:.2%}")
+        return
+
+    output = args.output or "q_table.qtb"
+    with _quiet(args.quiet):
+        _, stats = train(args.episodes or 3000, args.workers, args.seed, args.level, args.early_stop,
+                         output, args.stats or "training_stats.bin", args.record, args.trace_lambda,
+                         args.hogwild)
+    print(f"{output}: {stats['total_episodes']} episodes, win rate {stats['final_win_rate']:.2%}, "
+          f"avg score {int(stats['avg_final_score'])}")
+
+
+def cmd_eval(args):
+    try:
+        agent = load_policy(args.model)
+    except FileNotFoundError:
+        print(f" No trained model found: {args.model} (run: python main.py train)")
+        sys.exit(1)
+
+    if not args.headless:
+        import pygame
+        from mario_env import MarioGame
+        pygame.init()
+        try:
+            MarioGame(seed=args.seed, level_id=args.level).run_ai(agent)
+        finally:
+            pygame.quit()
+        return
+
+    from mario_sim import MarioSim
+    game = MarioSim(quiet=True, level_id=args.level, encode_states=True, seed=args.seed)
+    results = agent.evaluate(game, args.episodes)
+    print(f"{results['episodes']} episodes | Win rate: {results['win_rate']:.2%} | "
+          f"Avg score: {results['avg_score']:.1f} | Avg coins: {results['avg_coins']:.1f} "
+          f"({results['avg_coin_pct']:.1f}%) | Avg time: {results['avg_time']:.1f}s | "
+          f"Perfect runs: {results['perfect_runs']}")
+    if args.output:
+        import json
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+def cmd_export(args):
+    try:
+        policy = load_policy(args.model)
+    except FileNotFoundError:
+        print(f" No trained model found: {args.model} (run: python main.py train)")
+        sys.exit(1)
+    policy.save(args.output or os.path.splitext(args.model)[0] + '.pol')
+
+
+def cmd_play(args):
+    import pygame
+    from mario_env import MarioGame
+    pygame.init()
+    try:
+        MarioGame(seed=args.seed, level_id=args.level).run_human()
+    finally:
+        pygame.quit()
+
+
+def cmd_benchmark(args):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+    import run_benchmarks
+    run_benchmarks.main(args.args)
+
+
+def cmd_replay(args):
+    import mario_replay
+    mario_replay.main(args.args)
+
+
+def cmd_video(args):
+    import mario_video
+    mario_video.main(args.args)
+
+
+def cmd_serve(args):
+    import mario_server
+    mario_server.main(args.args)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Mario RL launcher (run without arguments for the interactive menu)")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--seed', type=int, help="seed for a reproducible run")
+    common.add_argument('--level', type=int, default=CLASSIC_LEVEL, help="level id (0 = classic, 1-3 procedural)")
+    common.add_argument('-q', '--quiet', action='store_true', help="only print the final result")
+    commands = parser.add_subparsers(dest='command', metavar='command')
+
+    p = commands.add_parser('train', parents=[common], help="train a Q-learning agent headless")
+    p.add_argument('-e', '--episodes', type=int,
+                   help="episodes to train (default 3000; per level with --curriculum, default TRAINING_DEFAULTS)")
+    p.add_argument('-w', '--workers', type=int, default=1, help="worker processes (default 1)")
+    p.add_argument('--hogwild', action='store_true',
+                   help="with -w N: workers update one shared Q-table lock-free instead of merging copies")
+    p.add_argument('--early-stop', action='store_true', help="stop once training converges (see mario_convergence)")
+    p.add_argument('--curriculum', action='store_true', help="train through levels 1-3 into the SAVE_FILES outputs")
+    p.add_argument('-o', '--output', help="Q-table file to write (default q_table.qtb; with --curriculum the "
+                   "final table, per-level tables get a _levelN suffix; default SAVE_FILES)")
+    p.add_argument('--stats', help="training stats file (default training_stats.bin; "
+                   "with --curriculum per-level _levelN files, default SAVE_FILES)")
+    p.add_argument('--record', metavar='TRAJ', help="record every episode to this trajectory file")
+    p.add_argument('--lambda', dest='trace_lambda', type=float, nargs='?', const=TRACE_LAMBDA, default=0.0,
+                   help=f"train with Watkins Q(lambda) eligibility traces (default lambda {TRACE_LAMBDA})")
+    p.set_defaults(func=cmd_train)
+
+    p = commands.add_parser('eval', parents=[common], help="evaluate a trained Q-table")
+    p.add_argument('--model', default="q_table.qtb", help="Q-table or .pol policy to load (default q_table.qtb)")
+    p.add_argument('-e', '--episodes', type=int, default=100, help="greedy episodes with --headless (default 100)")
+    p.add_argument('--headless', action='store_true', help="no window: play at full speed and print a summary")
+    p.add_argument('-o', '--output', help="write the --headless summary as JSON")
+    p.set_defaults(func=cmd_eval)
+
+    p = commands.add_parser('export', help="compile a Q-table into a frozen greedy policy (.pol)")
+    p.add_argument('model', nargs='?', default="q_table.qtb", help="Q-table to compile (default q_table.qtb)")
+    p.add_argument('-o', '--output', help="policy file to write (default: model name with .pol)")
+    p.set_defaults(func=cmd_export)
+
+    p = commands.add_parser('play', parents=[common], help="play the game yourself")
+    p.set_defaults(func=cmd_play)
+
+    p = commands.add_parser('benchmark', help="run benchmarks/run_benchmarks.py (arguments are passed through)")
+    p.add_argument('args', nargs=argparse.REMAINDER)
+    p.set_defaults(func=cmd_benchmark)
+
+    p = commands.add_parser('replay', help="run mario_replay.py (arguments are passed through)")
+    p.add_argument('args', nargs=argparse.REMAINDER)
+    p.set_defaults(func=cmd_replay)
+
+    p = commands.add_parser('video', help="run mario_video.py: export episodes to GIF/PNG/video (arguments are passed through)")
+    p.add_argument('args', nargs=argparse.REMAINDER)
+    p.set_defaults(func=cmd_video)
+
+    p = commands.add_parser('serve', help="run mario_server.py: policy server, load test, reload (arguments are passed through)")
+    p.add_argument('args', nargs=argparse.REMAINDER)
+    p.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        interactive()
+        return
+    if argv[0] in ('benchmark', 'replay', 'video', 'serve'):
+        # Hand everything after the command to the tool's own parser (including --help)
+        build_parser().parse_args(argv[:1]).func(argparse.Namespace(args=argv[1:]))
+        return
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return
+    args.func(args)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,23 +1,86 @@
 import random
-import json
-from collections import defaultdict
+from collections import OrderedDict
+import numpy as np
 from mario_config import *
+from mario_state import NUM_STATES, encode_state, decode_state
+from mario_stats import TrainingStats, INTERRUPTED
+from mario_policy import FrozenPolicy, evaluate_policy
+from mario_checkpoint import save_checkpoint, load_checkpoint, load_legacy_json
+
+class SparseTraces:
+    """Replacing eligibility traces, kept only for recently visited (state, action) pairs
+    
+    All traces fade by the same factor each step, so a pair's trace is just
+    decay ** (steps since its last visit). Pairs are kept in visit order and
+    dropped once their trace falls below min_trace, so an update touches a few
+    dozen Q-values instead of the whole table.
+    """
+    
+    def __init__(self, decay, min_trace=TRACE_MIN):
+        self.decay = decay
+        self.max_age = int(np.log(min_trace) / np.log(decay)) if 0 < decay < 1 else 0
+        self.powers = [decay ** age for age in range(self.max_age + 1)]
+        self.visits = OrderedDict()  # flat Q-table index -> step of last visit
+        self.clock = 0
+    
+    def __len__(self):
+        return len(self.visits)
+    
+    def visit(self, index):
+        """Set the trace of a flat (state * NUM_ACTIONS + action) index to 1"""
+        visits = self.visits
+        visits[index] = self.clock
+        visits.move_to_end(index)
+    
+    def apply(self, q_flat, step):
+        """Add step * trace to every traced Q-value"""
+        clock = self.clock
+        powers = self.powers
+        for index, visited in self.visits.items():
+            q_flat[index] += step * powers[clock - visited]
+    
+    def fade(self):
+        """Advance one step: every trace shrinks by decay, the faintest are dropped"""
+        self.clock += 1
+        visits = self.visits
+        oldest = self.clock - self.max_age
+        while visits and next(iter(visits.values())) < oldest:
+            visits.popitem(last=False)
+    
+    def clear(self):
+        self.visits.clear()
+        self.clock = 0
+
 
 class QLearningAgent:
     """Q-Learning agent optimized for coin collection and speed"""
     
-    def __init__(self):
-        self.q_table = defaultdict(lambda: [0.0] * NUM_ACTIONS)
+    def __init__(self, seed=None, trace_lambda=0.0):
+        # Own generator for exploration and tie-breaks: a (seed, Q-table) pair replays exactly
+        self.rng = random.Random(seed)
+        # Watkins Q(lambda) when > 0: credit flows back along the greedy run of recent actions
+        self.trace_lambda = trace_lambda
+        # Dense tables indexed by encoded state (see mario_state.encode_state)
+        self.q_table = np.zeros((NUM_STATES, NUM_ACTIONS))
+        self.action_counts = np.zeros((NUM_STATES, NUM_ACTIONS), dtype=np.int64)
+        self.visited = np.zeros(NUM_STATES, dtype=bool)
         self.epsilon = EPSILON_START
         self.learning_rate = LEARNING_RATE
         self.discount_factor = DISCOUNT_FACTOR
-        self.action_counts = defaultdict(lambda: [0] * NUM_ACTIONS)
+    
+    @property
+    def num_visited_states(self):
+        """Number of states the agent has acted in or learned about"""
+        return int(self.visited.sum())
     
     def get_action(self, state, explore=True):
-        """Select action using epsilon-greedy policy"""
-        if explore and random.random() < self.epsilon:
+        """Select action using epsilon-greedy policy (state may be a tuple or an encoded index)"""
+        if type(state) is tuple:
+            state = encode_state(state)
+        rng = self.rng
+        if explore and rng.random() < self.epsilon:
             # Smart exploration: prefer forward and jump actions
-            rand = random.random()
+            rand = rng.random()
             if rand < 0.35:
                 return 2  # RIGHT
             elif rand < 0.55:
@@ -25,176 +88,196 @@ class QLearningAgent:
             elif rand < 0.75:
                 return 3  # JUMP
             else:
-                return random.randint(0, NUM_ACTIONS - 1)
+                return rng.randint(0, NUM_ACTIONS - 1)
         else:
-            q_values = self.q_table[state]
+            # Plain-list max is cheaper than NumPy reductions on a 6-element row
+            q_values = self.q_table[state].tolist()
             max_q = max(q_values)
-            best_actions = [i for i, q in enumerate(q_values) if q == max_q]
-            action = random.choice(best_actions)
-            self.action_counts[state][action] += 1
+            if q_values.count(max_q) == 1:
+                action = q_values.index(max_q)
+            else:
+                action = rng.choice([i for i, q in enumerate(q_values) if q == max_q])
+            self.action_counts[state, action] += 1
+            self.visited[state] = True
             return action
     
     def update_q_value(self, state, action, reward, next_state, done):
         """Update Q-value using TD learning"""
-        current_q = self.q_table[state][action]
+        if type(state) is tuple:
+            state = encode_state(state)
+            next_state = encode_state(next_state)
+        row = self.q_table[state]
+        current_q = row[action]
         
         if done:
             target_q = reward
         else:
-            max_next_q = max(self.q_table[next_state])
+            max_next_q = max(self.q_table[next_state].tolist())
             target_q = reward + self.discount_factor * max_next_q
         
-        self.q_table[state][action] = current_q + self.learning_rate * (target_q - current_q)
+        row[action] = current_q + self.learning_rate * (target_q - current_q)
+        self.visited[state] = True
     
     def decay_epsilon(self):
         """Decay exploration rate"""
         self.epsilon = max(EPSILON_MIN, self.epsilon * EPSILON_DECAY)
     
-    def train(self, game, episodes):
-        """Train the agent"""
-        stats = {
-            'episode_rewards': [],
-            'episode_steps': [],
-            'episode_scores': [],
-            'episode_times': [],
-            'coins_collected': [],
-            'coin_percentages': [],
-            'success_rate': [],
-            'epsilon_values': [],
-            'perfect_runs': 0
-        }
+    def run_episode(self, game, recorder=None):
+        """Play one exploring episode with TD updates and return its result record
         
-        wins = 0
-        perfect_runs = 0
+        With a recorder (see mario_replay.TrajectoryRecorder) the episode's
+        actions are captured for replay and returned under 'trajectory'.
+        """
+        if self.trace_lambda > 0:
+            return self._run_episode_traces(game, recorder)
+        state = game.reset()
+        if recorder is not None:
+            recorder.begin(game, state)
+        total_reward = 0
+        steps = 0
         
-        print(f"{'Episode':<10}{'Result':<8}{'Time':<10}{'Score':<10}{'Coins':<15}{'Epsilon':<12}{'Win Rate':<12}")
-        print("-" * 90)
-        
-        for episode in range(episodes):
-            state = game.reset()
-            total_reward = 0
-            steps = 0
-            
-            while True:
-                action = self.get_action(state, explore=True)
-                next_state, reward, done = game.step(action)
-                
-                self.update_q_value(state, action, reward, next_state, done)
-                
-                total_reward += reward
-                steps += 1
-                state = next_state
-                
-                if done:
-                    break
+        while True:
+            action = self.get_action(state, explore=True)
+            next_state, reward, done = game.step(action)
             
-            if game.win:
-                wins += 1
-                if game.coins_collected == game.total_coins:
-                    perfect_runs += 1
+            self.update_q_value(state, action, reward, next_state, done)
+            if recorder is not None:
+                recorder.step(action, next_state, reward)
             
-            self.decay_epsilon()
+            total_reward += reward
+            steps += 1
+            state = next_state
             
-            # Record statistics
-            stats['episode_rewards'].append(total_reward)
-            stats['episode_steps'].append(steps)
-            stats['episode_scores'].append(game.score)
-            stats['episode_times'].append(game.time_taken)
-            stats['coins_collected'].append(game.coins_collected)
-            coin_pct = (game.coins_collected / game.total_coins * 100) if game.total_coins > 0 else 0
-            stats['coin_percentages'].append(coin_pct)
-            stats['epsilon_values'].append(self.epsilon)
+            if done:
+                break
+        
+        return self._episode_result(game, total_reward, steps, recorder)
+    
+    def _run_episode_traces(self, game, recorder=None):
+        """run_episode with Watkins Q(lambda): each TD error also updates the traced
+        recent pairs, and the traces are cut whenever an exploratory action is taken"""
+        traces = SparseTraces(self.discount_factor * self.trace_lambda)
+        q_table = self.q_table
+        q_flat = q_table.reshape(-1)
+        discount = self.discount_factor
+        learning_rate = self.learning_rate
+        
+        state = game.reset()
+        if recorder is not None:
+            recorder.begin(game, state)
+        action = self.get_action(state, explore=True)
+        total_reward = 0
+        steps = 0
+        
+        while True:
+            next_state, reward, done = game.step(action)
+            index = (encode_state(state) if type(state) is tuple else state) * NUM_ACTIONS + action
             
-            # Calculate win rate
-            if episode >= 99:
-                recent_wins = sum(1 for i in range(episode - 99, episode + 1) 
-                                if game.score > 0 and stats['episode_steps'][i] < MAX_STEPS)
-                win_rate = recent_wins / 100
+            if done:
+                target_q = reward
             else:
-                win_rate = wins / (episode + 1)
+                next_action = self.get_action(next_state, explore=True)
+                next_q = q_table[encode_state(next_state) if type(next_state) is tuple else next_state].tolist()
+                max_next_q = max(next_q)
+                target_q = reward + discount * max_next_q
             
-            stats['success_rate'].append(win_rate)
+            traces.visit(index)
+            traces.apply(q_flat, learning_rate * (target_q - q_flat[index]))
+            self.visited[index // NUM_ACTIONS] = True
+            if recorder is not None:
+                recorder.step(action, next_state, reward)
             
-            # Print progress every 50 episodes
-            if (episode + 1) % 50 == 0:
-                avg_time = sum(stats['episode_times'][max(0, episode-49):episode+1]) / min(50, episode+1)
-                avg_score = sum(stats['episode_scores'][max(0, episode-49):episode+1]) / min(50, episode+1)
-                avg_coins = sum(stats['coins_collected'][max(0, episode-49):episode+1]) / min(50, episode+1)
-                avg_coin_pct = sum(stats['coin_percentages'][max(0, episode-49):episode+1]) / min(50, episode+1)
-                
-                result = f"{wins}/{episode+1}"
-                coin_str = f"{avg_coins:.1f}/{game.total_coins} ({avg_coin_pct:.0f}%)"
-                
-                print(f"{episode+1:<10}{result:<8}{avg_time:<10.1f}{int(avg_score):<10}{coin_str:<15}{self.epsilon:<12.4f}{win_rate:<12.2%}")
-        
-        # Calculate final statistics
-        final_win_rate = sum(1 for i in range(max(0, episodes - 100), episodes) 
-                            if stats['episode_scores'][i] > 0) / min(100, episodes)
+            total_reward += reward
+            steps += 1
+            if done:
+                break
+            
+            if next_q[next_action] == max_next_q:
+                traces.fade()
+            else:
+                traces.clear()
+            state = next_state
+            action = next_action
         
-        avg_final_score = sum(stats['episode_scores'][max(0, episodes-100):]) / min(100, episodes)
-        avg_final_coins = sum(stats['coins_collected'][max(0, episodes-100):]) / min(100, episodes)
-        avg_final_coin_pct = sum(stats['coin_percentages'][max(0, episodes-100):]) / min(100, episodes)
-        avg_final_time = sum(stats['episode_times'][max(0, episodes-100):]) / min(100, episodes)
+        return self._episode_result(game, total_reward, steps, recorder)
+    
+    def _episode_result(self, game, total_reward, steps, recorder):
+        result = {
+            'reward': total_reward,
+            'steps': steps,
+            'score': game.score,
+            'time': game.time_taken,
+            'coins': game.coins_collected,
+            'total_coins': game.total_coins,
+            'win': game.win
+        }
+        if recorder is not None:
+            result['trajectory'] = recorder.end()
+        return result
+    
+    def train(self, game, episodes, stats_writer=None, recorder=None, stop_when=None):
+        """Train the agent (per-episode records are streamed to stats_writer, episodes to recorder, if given)
         
-        stats['final_win_rate'] = final_win_rate
-        stats['avg_final_score'] = avg_final_score
-        stats['avg_final_coins'] = avg_final_coins
-        stats['avg_final_coin_pct'] = avg_final_coin_pct
-        stats['avg_final_time'] = avg_final_time
-        stats['perfect_runs'] = perfect_runs
-        stats['total_episodes'] = episodes
-        stats['q_table_size'] = len(self.q_table)
+        stop_when(tracker) is called after every episode with the TrainingStats;
+        a truthy return (e.g. a reason string, see mario_convergence) ends training
+        early. Ctrl+C also stops cleanly with stop_reason INTERRUPTED, so the
+        caller can still save the Q-table (and should not carry on training).
+        """
+        tracker = TrainingStats(stats_writer)
+        tracker.print_header()
         
-        print("\n" + "="*90)
-        print(" TRAINING COMPLETE!")
-        print("="*90)
-        print(f"Performance (last 100 episodes):")
-        print(f"   • Win Rate: {final_win_rate:.2%}")
-        print(f"   • Avg Score: {int(avg_final_score)}")
-        print(f"   • Avg Coins: {avg_final_coins:.1f}/{game.total_coins} ({avg_final_coin_pct:.1f}%)")
-        print(f"   • Avg Time: {avg_final_time:.1f}s")
-        print(f"   • Perfect Runs: {perfect_runs}")
-        print(f"\n Q-table size: {len(self.q_table)} states")
-        print(f" Final epsilon: {self.epsilon:.4f}")
-        print("="*90)
+        try:
+            for episode in range(episodes):
+                result = self.run_episode(game, recorder)
+                self.decay_epsilon()
+                result['epsilon'] = self.epsilon
+                tracker.record(result)
+                if stop_when is not None:
+                    reason = stop_when(tracker)
+                    if reason:
+                        tracker.stop(reason)
+                        break
+        except KeyboardInterrupt:
+            tracker.stop(INTERRUPTED)
         
-        return stats
+        return tracker.finish(self.num_visited_states, self.epsilon)
+    
+    def evaluate(self, game, episodes):
+        """Play greedy episodes without learning; returns win rate and average score/coins/time
+
+        Plays the frozen policy, so action_counts and visited (training
+        bookkeeping that merges and checkpoints rely on) are left untouched.
+        """
+        return evaluate_policy(self.freeze(), game, episodes)
+    
+    def freeze(self):
+        """Compile the current Q-table into a read-only FrozenPolicy (see mario_policy)"""
+        return FrozenPolicy.from_agent(self)
     
     def save_q_table(self, filename):
-        """Save Q-table to file"""
-        q_dict = {str(k): v for k, v in self.q_table.items()}
-        action_dict = {str(k): v for k, v in self.action_counts.items()}
-        data = {
-            'q_table': q_dict,
-            'action_counts': action_dict,
-            'epsilon': self.epsilon
-        }
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=2)
-        print(f" Q-table saved: {filename} ({len(q_dict)} states)")
-    
-    def load_q_table(self, filename):
-        """Load Q-table from file"""
-        with open(filename, 'r') as f:
-            data = json.load(f)
-        
-        self.q_table = defaultdict(lambda: [0.0] * NUM_ACTIONS)
-        for k, v in data['q_table'].items():
-            state = eval(k)
-            self.q_table[state] = v
-        
-        if 'action_counts' in data:
-            self.action_counts = defaultdict(lambda: [0] * NUM_ACTIONS)
-            for k, v in data['action_counts'].items():
-                state = eval(k)
-                self.action_counts[state] = v
+        """Save Q-table to a binary checkpoint (see mario_checkpoint)"""
+        save_checkpoint(filename, self.q_table, self.action_counts, self.visited, self.epsilon)
+        print(f" Q-table saved: {filename} ({self.num_visited_states} states)")
+    
+    def load_q_table(self, filename, read_only=False):
+        """Load Q-table from a .qtb checkpoint (memory-mapped when read_only) or a legacy .json file"""
+        skipped = 0
+        if filename.endswith('.json'):
+            checkpoint, skipped = load_legacy_json(filename)
+        else:
+            checkpoint = load_checkpoint(filename, mmap=read_only)
         
-        self.epsilon = data.get('epsilon', EPSILON_MIN)
-        print(f" Loaded Q-table: {len(self.q_table)} states (epsilon: {self.epsilon:.4f})")
+        self.q_table = checkpoint.q_table if read_only else np.array(checkpoint.q_table)
+        self.action_counts = np.array(checkpoint.action_counts, dtype=np.int64)
+        self.visited = np.array(checkpoint.visited)
+        self.epsilon = checkpoint.epsilon
+        print(f" Loaded Q-table: {self.num_visited_states} states (epsilon: {self.epsilon:.4f})")
+        if skipped:
+            print(f" Skipped {skipped} states that don't match the current state layout")
     
     def print_policy_sample(self, num_states=10):
         """Print sample of learned policy"""
-        if len(self.q_table) == 0:
+        if self.num_visited_states == 0:
             print("\n  No policy learned yet (Q-table is empty)")
             return
             
@@ -203,12 +286,15 @@ class QLearningAgent:
         print(f"{'State Description':<60} | {'Best Action':<20} | {'Q-value':<10}")
         print("-" * 100)
         
-        sorted_states = sorted(self.q_table.items(), 
-                              key=lambda x: max(x[1]), reverse=True)[:num_states]
+        states = np.flatnonzero(self.visited)
+        best_q_values = self.q_table[states].max(axis=1)
+        top = states[np.argsort(-best_q_values, kind='stable')[:num_states]]
         
-        for state, q_values in sorted_states:
-            best_action = q_values.index(max(q_values))
-            best_q = max(q_values)
+        for index in top:
+            state = decode_state(index)
+            q_values = self.q_table[index]
+            best_action = int(q_values.argmax())
+            best_q = q_values[best_action]
             
             # Parse state for better readability
             obs_type_map = {0: 'None', 1: 'Pit', 2: 'Block', 3: 'Spike', 4: 'Enemy'}
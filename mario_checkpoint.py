@@ -0,0 +1,207 @@
+import ast
+import json
+import os
+import struct
+import sys
+import numpy as np
+from mario_config import *
+from mario_state import NUM_STATES, encode_state
+
+# Binary Q-table checkpoints (.qtb), little-endian:
+#
+#   magic       8 bytes  b'MARIOQT\0'
+#   version     uint32
+#   header_len  uint32   offset of the first array, a multiple of 64
+#   num_states  uint32
+#   num_actions uint32
+#   epsilon     float64
+#   schema_len  uint32
+#   flags       uint32   FLAG_COUNTS if the counts array is present (version 2+)
+#               followed by STATE_SPACE as UTF-8 JSON, zero padded to header_len
+#   q_table     float64[num_states, num_actions]
+#   counts      uint32[num_states, num_actions]  greedy visit counts (int64 in version 1)
+#   visited     uint8[num_states]
+#
+# The arrays can be np.memmap'd straight from the file, so many inference
+# processes can share one read-only copy of the table.
+
+MAGIC = b'MARIOQT\0'
+VERSION = 2
+FLAG_COUNTS = 1
+_FIXED_V1 = struct.Struct('<8sIIIIdI')
+_FIXED = struct.Struct('<8sIIIIdII')
+_ALIGN = 64
+_MAX_COUNT = 2**32 - 1
+
+# Older 5-field state layout: the 4 obstacle fields plus obstacle_width (0 narrow,
+# 1 wide), which is no longer part of the state, and no coin features
+_LEGACY_WIDTHS = (0, 1)
+_LEGACY_COINS = [(d, h) for d in STATE_SPACE['coin_distance'] for h in STATE_SPACE['coin_height']]
+
+class Checkpoint:
+    """Arrays and metadata read from a Q-table file"""
+
+    def __init__(self, q_table, action_counts, visited, epsilon, schema):
+        self.q_table = q_table
+        self.action_counts = action_counts
+        self.visited = visited
+        self.epsilon = epsilon
+        self.schema = schema
+
+
+def _schema():
+    return json.dumps(STATE_SPACE, separators=(',', ':')).encode('utf-8')
+
+
+def save_checkpoint(filename, q_table, action_counts, visited, epsilon):
+    """Write a Q-table checkpoint; the file is written to a temp name and renamed into place
+
+    Pass action_counts=None to leave the visit counts out (e.g. for tables
+    only used for inference); they load back as zeros.
+    """
+    schema = _schema()
+    header_len = -(-(_FIXED.size + len(schema)) // _ALIGN) * _ALIGN
+    num_states, num_actions = q_table.shape
+    flags = FLAG_COUNTS if action_counts is not None else 0
+
+    tmp = filename + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_FIXED.pack(MAGIC, VERSION, header_len, num_states, num_actions, float(epsilon), len(schema), flags))
+        f.write(schema)
+        f.write(b'\0' * (header_len - _FIXED.size - len(schema)))
+        f.write(np.ascontiguousarray(q_table, dtype='<f8').tobytes())
+        if action_counts is not None:
+            # Counts saturate rather than wrap
+            counts = np.minimum(np.asarray(action_counts), _MAX_COUNT)
+            f.write(np.ascontiguousarray(counts, dtype='<u4').tobytes())
+        f.write(np.ascontiguousarray(visited, dtype=np.uint8).tobytes())
+    os.replace(tmp, filename)
+
+
+def load_checkpoint(filename, mmap=True):
+    """Read a checkpoint; with mmap the arrays are read-only views onto the file"""
+    with open(filename, 'rb') as f:
+        fixed = f.read(_FIXED.size)
+        if len(fixed) < _FIXED_V1.size:
+            raise ValueError(f"{filename}: truncated Q-table header")
+        magic, version = struct.unpack_from('<8sI', fixed)
+        if magic != MAGIC:
+            raise ValueError(f"{filename}: not a Q-table checkpoint")
+        if version == 1:
+            _, _, header_len, num_states, num_actions, epsilon, schema_len = _FIXED_V1.unpack_from(fixed)
+            flags, counts_dtype = FLAG_COUNTS, '<i8'
+            f.seek(_FIXED_V1.size)
+        elif version == VERSION and len(fixed) == _FIXED.size:
+            _, _, header_len, num_states, num_actions, epsilon, schema_len, flags = _FIXED.unpack(fixed)
+            counts_dtype = '<u4'
+        else:
+            raise ValueError(f"{filename}: unsupported checkpoint version {version}")
+        schema = json.loads(f.read(schema_len).decode('utf-8'))
+
+    if schema != STATE_SPACE or num_states != NUM_STATES or num_actions != NUM_ACTIONS:
+        raise ValueError(f"{filename}: state encoding doesn't match this version of the game")
+
+    shape = (num_states, num_actions)
+    has_counts = bool(flags & FLAG_COUNTS)
+    q_offset = header_len
+    counts_offset = q_offset + num_states * num_actions * 8
+    visited_offset = counts_offset + (num_states * num_actions * np.dtype(counts_dtype).itemsize if has_counts else 0)
+    if mmap:
+        q_table = np.memmap(filename, dtype='<f8', mode='r', offset=q_offset, shape=shape)
+        if has_counts:
+            action_counts = np.memmap(filename, dtype=counts_dtype, mode='r', offset=counts_offset, shape=shape)
+        visited = np.memmap(filename, dtype=np.uint8, mode='r', offset=visited_offset, shape=(num_states,))
+    else:
+        with open(filename, 'rb') as f:
+            f.seek(q_offset)
+            q_table = np.fromfile(f, dtype='<f8', count=num_states * num_actions).reshape(shape)
+            if has_counts:
+                action_counts = np.fromfile(f, dtype=counts_dtype, count=num_states * num_actions).reshape(shape)
+            visited = np.fromfile(f, dtype=np.uint8, count=num_states)
+    if not has_counts:
+        action_counts = np.zeros(shape, dtype=np.int64)
+    return Checkpoint(q_table, action_counts, visited.astype(bool), epsilon, schema)
+
+
+def _legacy_fields(key):
+    """Current-layout fields of a legacy JSON key; 5-field keys lose their obstacle_width"""
+    fields = tuple(ast.literal_eval(key))
+    if len(fields) == 5:
+        if fields[4] not in _LEGACY_WIDTHS:
+            raise ValueError(key)
+        fields = fields[:4]
+        encode_state(fields + _LEGACY_COINS[0])
+    else:
+        encode_state(fields)
+    return fields
+
+
+def load_legacy_json(filename):
+    """Read an old q_table*.json file (stringified tuple keys); returns (Checkpoint, skipped state count)
+
+    5-field keys carry obstacle_width, which the state no longer has: rows
+    that differ only in width (pits can be either) are merged, each action
+    weighted by its visit counts (a plain mean where neither was visited),
+    and the merged row is copied to every coin_distance/coin_height.
+    """
+    with open(filename, 'r') as f:
+        data = json.load(f)
+    legacy_counts = data.get('action_counts', {})
+
+    groups = {}
+    skipped = 0
+    for k, v in data['q_table'].items():
+        try:
+            fields = _legacy_fields(k)
+        except (KeyError, ValueError, SyntaxError, TypeError):
+            # Keys from layouts we can't map onto the current encoding
+            skipped += 1
+            continue
+        groups.setdefault(fields, []).append((v, legacy_counts.get(k, [0] * NUM_ACTIONS)))
+
+    q_table = np.zeros((NUM_STATES, NUM_ACTIONS))
+    action_counts = np.zeros((NUM_STATES, NUM_ACTIONS), dtype=np.int64)
+    visited = np.zeros(NUM_STATES, dtype=bool)
+    for fields, rows in groups.items():
+        values = np.array([row[0] for row in rows], dtype=np.float64)
+        counts = np.array([row[1] for row in rows], dtype=np.int64)
+        total = counts.sum(axis=0)
+        merged = np.where(total > 0, (values * counts).sum(axis=0) / np.maximum(total, 1), values.mean(axis=0))
+        if len(fields) == 4:
+            states = [encode_state(fields + coin) for coin in _LEGACY_COINS]
+        else:
+            states = [encode_state(fields)]
+        q_table[states] = merged
+        action_counts[states] = total
+        visited[states] = True
+
+    if data['q_table'] and not visited.any():
+        raise ValueError(f"{filename}: none of the {skipped} states match a known state layout")
+
+    epsilon = data.get('epsilon', EPSILON_MIN)
+    return Checkpoint(q_table, action_counts, visited, epsilon, STATE_SPACE), skipped
+
+
+def convert_json(filename, output=None, counts=True):
+    """Convert a legacy JSON Q-table into a .qtb checkpoint next to it"""
+    output = output or os.path.splitext(filename)[0] + '.qtb'
+    checkpoint, skipped = load_legacy_json(filename)
+    save_checkpoint(output, checkpoint.q_table, checkpoint.action_counts if counts else None,
+                    checkpoint.visited, checkpoint.epsilon)
+    print(f" {filename} -> {output} ({int(checkpoint.visited.sum())} states, {skipped} skipped)")
+    return output
+
+
+if __name__ == "__main__":
+    paths = [arg for arg in sys.argv[1:] if arg != '--no-counts']
+    if not paths:
+        print("Usage: python mario_checkpoint.py [--no-counts] q_table.json [more.json ...]")
+        sys.exit(1)
+    failed = False
+    for path in paths:
+        try:
+            convert_json(path, counts='--no-counts' not in sys.argv)
+        except ValueError as e:
+            print(f" {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
@@ -2,6 +2,8 @@
 SCREEN_WIDTH = 1200
 SCREEN_HEIGHT = 500
 FPS = 60
+BACKGROUND_CHUNK_WIDTH = 512  # Width of the pre-drawn level background tiles
+BACKGROUND_CACHE_SCREENS = 3  # Screen-widths of background tiles kept around the camera (least recently used go first)
 
 # Colors
 SKY_COLOR = (100, 150, 255)  # Brighter blue
@@ -38,6 +40,8 @@ DISCOUNT_FACTOR = 0.99
 EPSILON_START = 1.0  # Start with full exploration
 EPSILON_MIN = 0.05  # Minimum exploration rate
 EPSILON_DECAY = 0.997  # Decay rate per episode
+TRACE_LAMBDA = 0.5  # Trace decay for Q(lambda) training (main.py train --lambda)
+TRACE_MIN = 0.01  # Eligibility traces below this are dropped
 
 # Actions - Including combined actions for better performance
 ACTIONS = {
@@ -50,7 +54,7 @@ ACTIONS = {
 }
 NUM_ACTIONS = 6
 
-# Level-specific settings (optional - for future use)
+# Level-specific colors (levels without an entry use SKY_COLOR / GROUND_COLOR)
 LEVEL_COLORS = {
     1: {
         'sky': (100, 150, 255),
@@ -82,13 +86,14 @@ REWARDS = {
     'jump_over_pit': 2  # Bonus for successfully jumping over pit
 }
 
-# State space parameters (for documentation)
+# State space: raw values MarioSim._get_state emits for each component, in tuple order
 STATE_SPACE = {
-    'obstacle_type': ['none', 'pit', 'block', 'spike', 'enemy'],  # 0-4
-    'distance_bucket': ['very_close', 'close', 'medium_close', 'medium', 'medium_far', 'far', 'none'],  # 0-6
-    'jump_state': ['on_ground', 'jumping_up', 'at_peak', 'falling'],  # 0-3
-    'over_pit': ['safe', 'over_pit'],  # 0-1
-    'obstacle_width': ['narrow', 'wide']  # 0-1
+    'obstacle_type': [0, 1, 2, 3, 4],  # none, pit, block, spike, enemy
+    'distance_bucket': [0, 1, 2, 3, 4, 5, 8],  # very close -> very far, 8 = no obstacle
+    'jump_state': [0, 1, 2, 3],  # on ground, rising, at peak, falling
+    'over_pit': [0, 1],  # safe, over pit
+    'coin_distance': [0, 1, 2, 8],  # nearby, close, medium far, 8 = no coin ahead
+    'coin_height': [0, 1, 2]  # low, mid, high
 }
 
 # Training parameters
@@ -98,25 +103,40 @@ TRAINING_DEFAULTS = {
         2: 2500,  # Level 2 - medium difficulty
         3: 3000   # Level 3 - harder, needs more training
     },
-    'progressive_training_episodes': 1500  # Episodes per level in progressive mode
+    'progressive_training_episodes': 1500,  # Episodes per level in progressive mode
+    'warm_start_epsilon': 0.3,  # Exploration each later curriculum level restarts from
+    'min_episodes_per_level': 300  # Never stop a level before this many episodes (plateaus: CONVERGENCE_*)
 }
 
+# Parallel training (mario_parallel.ParallelTrainer)
+PARALLEL_SYNC_EVERY = 25  # Episodes each worker plays between Q-table merges
+
+# Policy server (mario_server)
+SERVER_SOCKET = '/tmp/mario_policy.sock'  # Unix socket the server listens on
+SERVER_BATCH_SIZE = 256  # Answer a micro-batch as soon as it holds this many states
+SERVER_BATCH_DELAY = 0.0  # Seconds to wait for more requests (0 = whatever arrived in one loop iteration)
+SERVER_WATCH_INTERVAL = 1.0  # Seconds between checkpoint mtime checks with --watch
+
 # Display settings
 SHOW_DEBUG_STATE = True  # Show current state on screen
 SHOW_POLICY_SAMPLES = 10  # Number of policy samples to show after training
 
 # File names for saving/loading
 SAVE_FILES = {
-    'q_table_level_1': 'q_table_level1.json',
-    'q_table_level_2': 'q_table_level2.json',
-    'q_table_level_3': 'q_table_level3.json',
-    'q_table_all_levels': 'q_table_all_levels.json',
-    'stats_level_1': 'training_stats_level1.json',
-    'stats_level_2': 'training_stats_level2.json',
-    'stats_level_3': 'training_stats_level3.json',
-    'stats_all_levels': 'training_stats_all_levels.json'
+    'q_table_level_1': 'q_table_level1.qtb',
+    'q_table_level_2': 'q_table_level2.qtb',
+    'q_table_level_3': 'q_table_level3.qtb',
+    'q_table_all_levels': 'q_table_all_levels.qtb',
+    'stats_level_1': 'training_stats_level1.bin',
+    'stats_level_2': 'training_stats_level2.bin',
+    'stats_level_3': 'training_stats_level3.bin',
+    'stats_all_levels': 'training_stats_all_levels.json'  # per-level summaries
 }
 
+# Level 0 is the hand-built classic layout; levels 1-3 follow LEVEL_PARAMS
+CLASSIC_LEVEL = 0
+LEVEL_SEED_POOL = 16  # reset() draws the layout seed from this many when none is fixed
+
 # Level difficulty parameters (for level generation)
 LEVEL_PARAMS = {
     1: {
@@ -147,4 +167,13 @@ LEVEL_PARAMS = {
 
 # Performance monitoring
 PRINT_PROGRESS_EVERY = 25  # Print training progress every N episodes
-WIN_RATE_WINDOW = 100  # Calculate win rate over last N episodes
\ No newline at end of file
+WIN_RATE_WINDOW = 100  # Calculate win rate over last N episodes
+STATS_FLUSH_EVERY = 50  # Episodes buffered before the stats file is flushed to disk
+
+# Early stopping (see mario_convergence.ConvergenceMonitor)
+CONVERGENCE_PATIENCE = 300  # Stop after this many episodes without win-rate or score improvement
+CONVERGENCE_MIN_DELTA = 0.02  # Rolling win-rate gain that counts as an improvement
+CONVERGENCE_SCORE_DELTA = 0.02  # Relative rolling-score gain that counts as an improvement
+CONVERGENCE_Q_TOLERANCE = None  # Stop once max |Q change| over a window is below this (None = off; pit/spike penalties keep it at 40+)
+CONVERGENCE_Q_WINDOW = 100  # Episodes between Q-table change checks
+CONVERGENCE_MIN_EPISODES = 500  # Never stop before this many episodes
\ No newline at end of file
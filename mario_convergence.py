@@ -0,0 +1,72 @@
+import numpy as np
+from mario_config import *
+
+
+class ConvergenceMonitor:
+    """Stop condition for agent.train / ParallelTrainer.train: training has stopped paying off
+
+    Two criteria, either of which ends training (once min_episodes have been played):
+
+    * plateau: neither the rolling win rate (by min_delta) nor the rolling
+      average score (by score_delta, relative) has improved for `patience` episodes
+    * Q-table: the largest change of any Q-value over the last q_window
+      episodes is below q_tolerance (disabled when q_tolerance is None)
+    """
+
+    def __init__(self, agent, patience=CONVERGENCE_PATIENCE, min_delta=CONVERGENCE_MIN_DELTA,
+                 score_delta=CONVERGENCE_SCORE_DELTA, q_tolerance=CONVERGENCE_Q_TOLERANCE,
+                 q_window=CONVERGENCE_Q_WINDOW, min_episodes=CONVERGENCE_MIN_EPISODES):
+        self.agent = agent
+        self.patience = patience
+        self.min_delta = min_delta
+        self.score_delta = score_delta
+        self.q_tolerance = q_tolerance
+        self.q_window = q_window
+        self.min_episodes = min_episodes
+
+        self.best_win_rate = -1.0
+        self.best_score = None
+        self.last_improvement = 0
+        self.max_q_delta = None
+        self._q_snapshot = None
+        self._q_checked = 0
+
+    def _check_improvement(self, tracker):
+        metrics = tracker.metrics
+        improved = False
+        win_rate = metrics.win_rate()
+        if win_rate >= self.best_win_rate + self.min_delta:
+            self.best_win_rate = win_rate
+            improved = True
+        score = metrics.mean('score')
+        if self.best_score is None or score >= self.best_score + max(abs(self.best_score) * self.score_delta, 1.0):
+            self.best_score = score
+            improved = True
+        if improved:
+            self.last_improvement = tracker.episodes
+
+    def _check_q_delta(self, tracker):
+        """Max |Q change| since the previous check, measured every q_window episodes"""
+        if tracker.episodes - self._q_checked < self.q_window and self._q_snapshot is not None:
+            return
+        q_table = self.agent.q_table
+        if self._q_snapshot is not None:
+            self.max_q_delta = float(np.abs(q_table - self._q_snapshot).max())
+            self._q_snapshot[:] = q_table
+        else:
+            self._q_snapshot = np.array(q_table)
+        self._q_checked = tracker.episodes
+
+    def __call__(self, tracker):
+        self._check_improvement(tracker)
+        if self.q_tolerance is not None:
+            self._check_q_delta(tracker)
+        if tracker.episodes < self.min_episodes:
+            return None
+
+        if tracker.episodes - self.last_improvement >= self.patience:
+            return (f"converged: win rate {self.best_win_rate:.2%} / avg score {int(self.best_score)} "
+                    f"not improved in {self.patience} episodes")
+        if self.max_q_delta is not None and self.max_q_delta < self.q_tolerance:
+            return f"converged: max Q-value change {self.max_q_delta:.3f} < {self.q_tolerance} over {self.q_window} episodes"
+        return None
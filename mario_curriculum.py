@@ -0,0 +1,127 @@
+import json
+import os
+import random
+from mario_config import *
+from mario_sim import MarioSim
+from mario_stats import StatsWriter, INTERRUPTED
+from mario_convergence import ConvergenceMonitor
+
+
+class CurriculumTrainer:
+    """Train one agent through levels 1 -> 3, carrying its Q-table from level to level
+
+    Each level gets at most episodes_per_level episodes (TRAINING_DEFAULTS by
+    default) and is cut short by a ConvergenceMonitor (CONVERGENCE_* plateau
+    settings, at least TRAINING_DEFAULTS['min_episodes_per_level'] episodes).
+    Later levels restart exploration at warm_start_epsilon instead of
+    EPSILON_START, since the inherited Q-table already knows how to run, jump
+    and pick up coins.
+
+    Files default to SAVE_FILES. With output (the final Q-table) or
+    stats_file given, the per-level files are named after them instead:
+    q.qtb -> q_level1.qtb, stats.bin -> stats_level1.bin and the summary
+    stats_all_levels.json. A TrajectoryWriter passed as recorder receives
+    the episodes of every level.
+
+    Ctrl+C ends the level being trained (stop_reason INTERRUPTED); its
+    progress and the final Q-table and summary are saved, and later levels
+    are skipped.
+    """
+
+    def __init__(self, agent, levels=(1, 2, 3), episodes_per_level=None, warm_start_epsilon=None,
+                 early_stop=True, num_workers=1, seed=None, output=None, stats_file=None, recorder=None):
+        self.agent = agent
+        self.levels = tuple(levels)
+        self.episodes_per_level = episodes_per_level
+        self.warm_start_epsilon = (TRAINING_DEFAULTS['warm_start_epsilon']
+                                   if warm_start_epsilon is None else warm_start_epsilon)
+        self.early_stop = early_stop
+        self.num_workers = num_workers
+        self.seed = seed
+        self.output = output
+        self.stats_file = stats_file
+        self.recorder = recorder
+        # One seed fixes every level's environment (and worker) streams
+        seeder = random.Random(seed)
+        self._level_seeds = {level_id: seeder.getrandbits(31) if seed is not None else None
+                             for level_id in self.levels}
+
+    def _level_file(self, filename, level_id, default_key):
+        if filename is None:
+            return SAVE_FILES[f'{default_key}_{level_id}']
+        stem, ext = os.path.splitext(filename)
+        return f"{stem}_level{level_id}{ext}"
+
+    def _summary_file(self):
+        if self.stats_file is None:
+            return SAVE_FILES['stats_all_levels']
+        return os.path.splitext(self.stats_file)[0] + '_all_levels.json'
+
+    def level_budget(self, level_id):
+        if self.episodes_per_level:
+            return self.episodes_per_level
+        return TRAINING_DEFAULTS['episodes_per_level'].get(level_id, TRAINING_DEFAULTS['progressive_training_episodes'])
+
+    def train_level(self, level_id, warm_start):
+        """Train on one level, save its Q-table and stats, and return the training summary"""
+        agent = self.agent
+        if warm_start:
+            agent.epsilon = max(agent.epsilon, self.warm_start_epsilon)
+        budget = self.level_budget(level_id)
+        stop_when = None
+        if self.early_stop:
+            stop_when = ConvergenceMonitor(agent, min_episodes=TRAINING_DEFAULTS['min_episodes_per_level'])
+
+        print(f"\n{'='*70}")
+        print(f"CURRICULUM LEVEL {level_id}: up to {budget} episodes "
+              f"({'warm start' if warm_start else 'fresh Q-table'}, epsilon {agent.epsilon:.2f})")
+        print(f"{'='*70}")
+
+        seed = self._level_seeds[level_id]
+        with StatsWriter(self._level_file(self.stats_file, level_id, 'stats_level')) as stats_writer:
+            if self.num_workers > 1:
+                from mario_parallel import ParallelTrainer
+                trainer = ParallelTrainer(agent, num_workers=self.num_workers, seed=seed, level_id=level_id)
+                stats = trainer.train(budget, stats_writer=stats_writer, recorder=self.recorder, stop_when=stop_when)
+            else:
+                game = MarioSim(quiet=True, level_id=level_id, encode_states=True, seed=seed)
+                stats = agent.train(game, budget, stats_writer=stats_writer, recorder=self.recorder,
+                                    stop_when=stop_when)
+
+        agent.save_q_table(self._level_file(self.output, level_id, 'q_table_level'))
+        stats['level_id'] = level_id
+        stats['episode_budget'] = budget
+        return stats
+
+    def train(self):
+        """Run the whole curriculum; returns the per-level summaries (also saved as the JSON summary)"""
+        results = []
+        for i, level_id in enumerate(self.levels):
+            results.append(self.train_level(level_id, warm_start=i > 0))
+            if results[-1]['stop_reason'] == INTERRUPTED:
+                print(f"\n Curriculum interrupted on level {level_id}, skipping the remaining levels")
+                break
+
+        self.agent.save_q_table(self.output or SAVE_FILES['q_table_all_levels'])
+        with open(self._summary_file(), 'w') as f:
+            json.dump(results, f, indent=2)
+
+        self.print_summary(results)
+        return results
+
+    def print_summary(self, results):
+        used = sum(r['total_episodes'] for r in results)
+        budget = sum(r['episode_budget'] for r in results)
+        print(f"\n{'='*70}")
+        print(" CURRICULUM SUMMARY")
+        print(f"{'='*70}")
+        print(f"{'Level':<8}{'Episodes':<14}{'Win Rate':<12}{'Avg Score':<12}{'Stopped early'}")
+        for r in results:
+            episodes = f"{r['total_episodes']}/{r['episode_budget']}"
+            early = r['stop_reason'] if r['stop_reason'] == INTERRUPTED else 'yes' if r['stop_reason'] else 'no'
+            print(f"{r['level_id']:<8}{episodes:<14}{r['final_win_rate']:<12.2%}{int(r['avg_final_score']):<12}{early}")
+        if results and results[-1]['stop_reason'] == INTERRUPTED:
+            print(f"\n Episodes used: {used}/{budget} (interrupted)")
+        else:
+            print(f"\n Episodes used: {used}/{budget} ({1 - used / budget:.0%} saved by early stopping)")
+        print(f"{'='*70}")
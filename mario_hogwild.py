@@ -0,0 +1,140 @@
+import os
+import queue
+import random
+import signal
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from mario_config import *
+from mario_agent import QLearningAgent
+from mario_sim import MarioSim
+from mario_state import NUM_STATES
+from mario_stats import TrainingStats, INTERRUPTED
+from mario_replay import TrajectoryRecorder
+
+
+def _worker_loop(shm_name, shared, results, seed, episodes, record, level_id, trace_lambda):
+    """Worker process: claim episodes from the shared counter and learn straight into the shared Q-table"""
+    # Ctrl+C is the parent's to handle: it raises the stop flag and we finish the current episode
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    lock, claimed, epsilon, stop = shared
+    seeder = random.Random(seed)
+    game = MarioSim(quiet=True, level_id=level_id, encode_states=True, seed=seeder.getrandbits(64))
+    agent = QLearningAgent(seed=seeder.getrandbits(64), trace_lambda=trace_lambda)
+    recorder = TrajectoryRecorder(*record) if record else None
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    agent.q_table = np.ndarray((NUM_STATES, NUM_ACTIONS), dtype=np.float64, buffer=shm.buf)
+    try:
+        while not stop.value:
+            # Claiming an episode and stepping epsilon is the only locked section
+            with lock:
+                if claimed.value >= episodes:
+                    break
+                claimed.value += 1
+                agent.epsilon = epsilon.value
+                epsilon.value = max(EPSILON_MIN, epsilon.value * EPSILON_DECAY)
+            result = agent.run_episode(game, recorder)
+            result['epsilon'] = max(EPSILON_MIN, agent.epsilon * EPSILON_DECAY)
+            results.put(result)
+    finally:
+        # Drop the view before closing the mapping it points into
+        agent.q_table = None
+        shm.close()
+        results.put((agent.action_counts, agent.visited))
+
+
+class HogwildTrainer:
+    """Trains a QLearningAgent with worker processes sharing one Q-table, updated lock-free (Hogwild)
+
+    The Q-table lives in shared memory and every worker applies its TD updates
+    to it directly, so there is no copy or merge step: a worker sees the
+    others' updates as soon as they are written. Concurrent updates to the
+    same entry can occasionally overwrite each other; with thousands of states
+    and sparse visits that is rare and costs less than synchronising.
+
+    The episode counter and epsilon are shared as well, so the schedule is
+    the same as single-process training; per-episode results reach the
+    parent through a queue. Episode order (and so the run) depends on process
+    scheduling and is not reproducible even with a seed.
+    """
+
+    def __init__(self, agent, num_workers=None, seed=None, level_id=CLASSIC_LEVEL):
+        self.agent = agent
+        self.level_id = level_id
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.seed = seed if seed is not None else random.randrange(2**31)
+
+    def train(self, episodes, stats_writer=None, recorder=None, stop_when=None):
+        """Train for a total of `episodes` episodes across all workers; returns the same stats as agent.train
+
+        Episodes are logged (and recorded) in the order they finish.
+        stop_when works as in agent.train and is checked after every episode.
+        On Ctrl+C the workers finish their current episode and the run ends
+        with stop_reason INTERRUPTED, keeping everything learned so far.
+        """
+        agent = self.agent
+        record = (recorder.record_states, recorder.record_rewards) if recorder is not None else None
+
+        shm = shared_memory.SharedMemory(create=True, size=agent.q_table.nbytes)
+        q_table = np.ndarray(agent.q_table.shape, dtype=np.float64, buffer=shm.buf)
+        q_table[:] = agent.q_table
+        # The parent's agent watches the live table too (stop_when may look at Q-values)
+        agent.q_table = q_table
+        shared = (mp.Lock(), mp.Value('q', 0, lock=False), mp.Value('d', agent.epsilon, lock=False),
+                  mp.Value('b', 0, lock=False))
+        results = mp.Queue()
+
+        workers = []
+        for i in range(self.num_workers):
+            proc = mp.Process(target=_worker_loop,
+                              args=(shm.name, shared, results, self.seed + i, episodes, record,
+                                    self.level_id, agent.trace_lambda), daemon=True)
+            proc.start()
+            workers.append(proc)
+
+        print(f" Hogwild training: {self.num_workers} workers sharing one Q-table\n")
+        tracker = TrainingStats(stats_writer)
+        tracker.print_header()
+        stop = shared[3]
+
+        running = len(workers)
+        try:
+            while running:
+                try:
+                    message = results.get(timeout=1.0)
+                    if type(message) is dict:
+                        if recorder is not None:
+                            recorder.write(message.pop('trajectory'))
+                        tracker.record(message)
+                        if stop_when is not None and not stop.value:
+                            reason = stop_when(tracker)
+                            if reason:
+                                tracker.stop(reason)
+                                stop.value = 1
+                    else:
+                        # A worker finished: fold in its visit counts
+                        action_counts, visited = message
+                        agent.action_counts += action_counts
+                        agent.visited |= visited
+                        running -= 1
+                except queue.Empty:
+                    if not any(proc.is_alive() for proc in workers):
+                        print(" A worker exited without reporting back")
+                        break
+                except KeyboardInterrupt:
+                    # Workers ignore SIGINT: they finish their episode, report back and exit
+                    if not stop.value:
+                        tracker.stop(INTERRUPTED)
+                        stop.value = 1
+        finally:
+            stop.value = 1
+            for proc in workers:
+                proc.join(timeout=5)
+            agent.q_table = np.array(q_table)
+            agent.epsilon = shared[2].value
+            del q_table
+            shm.close()
+            shm.unlink()
+
+        return tracker.finish(agent.num_visited_states, agent.epsilon)
@@ -0,0 +1,421 @@
+import random
+from bisect import bisect_left, bisect_right
+from types import MappingProxyType
+import numpy as np
+from mario_config import *
+
+# Obstacle type codes (same numbering as the state's obstacle_type)
+OBSTACLE_CODES = {'pit': 1, 'block': 2, 'spike': 3, 'enemy': 4}
+
+
+class Level:
+    """Compiled, read-only level layout shared by every env that plays it"""
+    
+    def __init__(self, key, obstacles, coins, goal_x, max_steps=MAX_STEPS):
+        self.key = key
+        self.level_id = key[0]
+        self.max_steps = max_steps
+        self.obstacles = tuple(MappingProxyType(dict(obs)) for obs in obstacles)
+        self.coin_x = tuple(coin['x'] for coin in coins)
+        self.coin_y = tuple(coin['y'] for coin in coins)
+        self.num_coins = len(coins)
+        self.goal_x = goal_x
+        
+        # x-sorted indexes so per-step lookups only touch entities within reach
+        self.obs_order = tuple(sorted(range(len(self.obstacles)), key=lambda i: self.obstacles[i]['x']))
+        self.obs_xs = tuple(self.obstacles[i]['x'] for i in self.obs_order)
+        self.pit_order = tuple(i for i in self.obs_order if self.obstacles[i]['type'] == 'pit')
+        self.pit_xs = tuple(self.obstacles[i]['x'] for i in self.pit_order)
+        self.coin_order = tuple(sorted(range(self.num_coins), key=lambda i: self.coin_x[i]))
+        self.coin_xs = tuple(self.coin_x[i] for i in self.coin_order)
+        
+        # Widest horizontal extent of any obstacle, bounds how far back a hit can start
+        self.obs_reach = max([max(obs.get('width', 0), obs.get('radius', 0)) for obs in self.obstacles] + [0])
+        self.pit_reach = max([self.obstacles[i]['width'] for i in self.pit_order] + [0])
+        
+        # Read-only NumPy columns in level order, consumed directly by VectorMarioEnv
+        obstacles = self.obstacles
+        self.arrays = (
+            np.array([OBSTACLE_CODES[obs['type']] for obs in obstacles], dtype=np.int8),
+            np.array([obs['x'] for obs in obstacles], dtype=float),
+            np.array([obs.get('y', GROUND_Y) for obs in obstacles], dtype=float),
+            np.array([obs.get('width', 0) for obs in obstacles], dtype=float),
+            np.array([obs.get('height', 0) for obs in obstacles], dtype=float),
+            np.array([obs.get('radius', 0) for obs in obstacles], dtype=float),
+            np.array(self.coin_x, dtype=float),
+            np.array(self.coin_y, dtype=float),
+        )
+        for array in self.arrays:
+            array.flags.writeable = False
+    
+    @staticmethod
+    def between(xs, order, lo, hi):
+        """Indices (in level order) of the entities whose x lies strictly between lo and hi"""
+        return sorted(order[bisect_right(xs, lo):bisect_left(xs, hi)])
+    
+    def print_summary(self):
+        """Print the level banner"""
+        print(f"\n🏁 Level generated:")
+        print(f"   • Obstacles: {len(self.obstacles)}")
+        print(f"   • Coins: {self.num_coins}")
+        print(f"   • Goal distance: {self.goal_x} pixels")
+        print(f"   • Estimated time needed: ~{self.goal_x / (PLAYER_SPEED * FPS):.1f}s at full speed")
+        print()
+
+
+_level_cache = {}
+
+
+def _freeze(params):
+    """Hashable form of a LEVEL_PARAMS entry"""
+    if params is None:
+        return None
+    return tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in params.items()))
+
+
+def get_level(level_id=CLASSIC_LEVEL, seed=0, quiet=False, num_patterns=None):
+    """Return the compiled level for (level id, seed, params, length), generating it only on first use
+    
+    Levels in LEVEL_PARAMS are procedural; num_patterns overrides their length.
+    """
+    params = LEVEL_PARAMS.get(level_id)
+    key = (level_id, seed, _freeze(params), num_patterns)
+    level = _level_cache.get(key)
+    if level is None:
+        rng = random.Random(seed)
+        if level_id == CLASSIC_LEVEL:
+            if num_patterns is not None:
+                raise ValueError("The classic level has a fixed length")
+            obstacles, coins, goal_x = generate_classic_level(rng)
+            max_steps = MAX_STEPS
+        elif params is not None:
+            obstacles, coins, goal_x = generate_procedural_level(params, rng, num_patterns)
+            # Longer levels get proportionally more time (same slack as the classic level)
+            max_steps = max(MAX_STEPS, int(goal_x / PLAYER_SPEED * 1.5))
+        else:
+            raise ValueError(f"Unknown level: {level_id}")
+        level = Level(key, obstacles, coins, goal_x, max_steps)
+        _level_cache[key] = level
+        if not quiet:
+            level.print_summary()
+    return level
+
+
+def clear_level_cache():
+    """Drop every compiled level"""
+    _level_cache.clear()
+
+
+def generate_classic_level(rng):
+    """Generate enhanced level with all obstacle types and better coin placement"""
+    obstacles = []
+    coins = []
+    x = 300
+
+    # Shorter, more focused pattern sequence - easier to complete
+    patterns = [
+        'coin_trail', 'easy_pit', 'coin_trail', 'single_block', 
+        'safe_space', 'pit_coins', 'coin_arc', 'spike_coins', 
+        'safe_space', 'block_coins', 'coin_trail', 'enemy_coins',
+        'safe_space', 'easy_pit', 'double_block_coins', 
+        'coin_maze', 'safe_space', 'final_coin_rush'
+    ]
+
+    for pattern in patterns:
+        if pattern == 'coin_trail':
+            # Simple coin trail on ground
+            for i in range(8):
+                coins.append({
+                    'x': x + i * 30,
+                    'y': GROUND_Y - 40
+                })
+            x += 280
+
+        elif pattern == 'safe_space':
+            # Safe space with just a few coins
+            for i in range(3):
+                coins.append({
+                    'x': x + i * 40,
+                    'y': GROUND_Y - 50
+                })
+            x += 180
+
+        elif pattern == 'easy_pit':
+            # Easy pit that's jumpable
+            pit_width = rng.choice([60, 70])
+            obstacles.append({
+                'type': 'pit',
+                'x': x,
+                'width': pit_width
+            })
+            # Coins before and after pit
+            coins.append({
+                'x': x - 40,
+                'y': GROUND_Y - 60
+            })
+            coins.append({
+                'x': x + pit_width + 40,
+                'y': GROUND_Y - 60
+            })
+            x += pit_width + 200
+
+        elif pattern == 'pit_coins':
+            # Pit with coins above
+            pit_width = 70
+            obstacles.append({
+                'type': 'pit',
+                'x': x,
+                'width': pit_width
+            })
+            # Coins above pit at different heights
+            for i in range(5):
+                coins.append({
+                    'x': x + 10 + i * 15,
+                    'y': GROUND_Y - 100 - (i % 2) * 20
+                })
+            x += pit_width + 200
+
+        elif pattern == 'single_block':
+            # Single block obstacle
+            block_height = 50
+            obstacles.append({
+                'type': 'block',
+                'x': x,
+                'y': GROUND_Y - block_height,
+                'width': 40,
+                'height': block_height
+            })
+            # Coin on top of block
+            coins.append({
+                'x': x + 20,
+                'y': GROUND_Y - block_height - 40
+            })
+            x += 200
+
+        elif pattern == 'block_coins':
+            # Block with coins on top and around
+            block_height = 50
+            obstacles.append({
+                'type': 'block',
+                'x': x,
+                'y': GROUND_Y - block_height,
+                'width': 40,
+                'height': block_height
+            })
+            # Coin on top of block
+            coins.append({
+                'x': x + 20,
+                'y': GROUND_Y - block_height - 40
+            })
+            # Coins before and after block
+            coins.append({
+                'x': x - 40,
+                'y': GROUND_Y - 60
+            })
+            coins.append({
+                'x': x + 80,
+                'y': GROUND_Y - 60
+            })
+            x += 250
+
+        elif pattern == 'coin_arc':
+            # Arc of coins (rainbow shape)
+            for i in range(9):
+                height = 50 + abs(4 - i) * 20
+                coins.append({
+                    'x': x + i * 30,
+                    'y': GROUND_Y - height
+                })
+            x += 300
+
+        elif pattern == 'spike_coins':
+            # Spike with coins requiring jump
+            obstacles.append({
+                'type': 'spike',
+                'x': x,
+                'y': GROUND_Y - 50,
+                'width': 40,
+                'height': 50
+            })
+            # High coins above spike
+            for i in range(3):
+                coins.append({
+                    'x': x - 30 + i * 30,
+                    'y': GROUND_Y - 120
+                })
+            x += 250
+
+        elif pattern == 'coin_challenge':
+            # High coins in a line (requires multiple jumps)
+            for i in range(6):
+                coins.append({
+                    'x': x + i * 40,
+                    'y': GROUND_Y - 140
+                })
+            x += 280
+
+        elif pattern == 'enemy_coins':
+            # Enemy with coins around it
+            obstacles.append({
+                'type': 'enemy',
+                'x': x + 40,
+                'y': GROUND_Y - 30,
+                'radius': 15,
+                'start_x': x + 40,
+                'range': 80
+            })
+            # Coins that require jumping over enemy
+            for i in range(4):
+                coins.append({
+                    'x': x - 20 + i * 40,
+                    'y': GROUND_Y - 100
+                })
+            x += 280
+
+        elif pattern == 'block_stairs_coins':
+            # Stairs with coins on each step
+            for i in range(4):
+                height = 35 + i * 15
+                obstacles.append({
+                    'type': 'block',
+                    'x': x + i * 60,
+                    'y': GROUND_Y - height,
+                    'width': 40,
+                    'height': height
+                })
+                # Coin on each step
+                coins.append({
+                    'x': x + i * 60 + 20,
+                    'y': GROUND_Y - height - 35
+                })
+            x += 300
+
+        elif pattern == 'coin_maze':
+            # Zigzag coin pattern
+            for i in range(10):
+                height = 60 + (i % 3) * 35
+                coins.append({
+                    'x': x + i * 25,
+                    'y': GROUND_Y - height
+                })
+            x += 280
+
+        elif pattern == 'double_block_coins':
+            # Two blocks with gap and coins
+            for i in range(2):
+                obstacles.append({
+                    'type': 'block',
+                    'x': x + i * 120,
+                    'y': GROUND_Y - 55,
+                    'width': 40,
+                    'height': 55
+                })
+                # Coin on block
+                coins.append({
+                    'x': x + i * 120 + 20,
+                    'y': GROUND_Y - 95
+                })
+            # Coins in the gap
+            for j in range(2):
+                coins.append({
+                    'x': x + 60 + j * 20,
+                    'y': GROUND_Y - 70
+                })
+            x += 280
+
+        elif pattern == 'final_coin_rush':
+            # Final section with many coins leading to goal
+            # Ground coins
+            for i in range(12):
+                coins.append({
+                    'x': x + i * 25,
+                    'y': GROUND_Y - 40
+                })
+            # High coins
+            for i in range(10):
+                coins.append({
+                    'x': x + 30 + i * 30,
+                    'y': GROUND_Y - 110
+                })
+            x += 400
+
+    # Set goal position closer - make it reachable
+    goal_x = x + 50
+
+    return obstacles, coins, goal_x
+
+
+PROCEDURAL_PATTERNS = ['pit', 'pit', 'block', 'double_block', 'spike', 'enemy', 'coins']
+
+
+def _coin_arc(coins, left, right, count, low, high):
+    """Evenly spaced coins from left to right, rising from `low` to `high` above the ground mid-way"""
+    for i in range(count):
+        t = i / (count - 1) if count > 1 else 0.5
+        coins.append({
+            'x': int(left + (right - left) * t),
+            'y': int(GROUND_Y - low - (high - low) * (1 - abs(2 * t - 1)))
+        })
+
+
+def generate_procedural_level(params, rng, num_patterns=None):
+    """Generate a level of num_patterns obstacle patterns (default params['num_patterns']) from a LEVEL_PARAMS entry
+    
+    Obstacles and coins are emitted left to right, so the level is x-sorted.
+    """
+    obstacles = []
+    coins = []
+    x = 300
+    pit_lo, pit_hi = params['pit_widths']
+    block_lo, block_hi = params['block_heights']
+    per_pattern = params['coins_per_pattern']
+
+    for _ in range(num_patterns or params['num_patterns']):
+        pattern = rng.choice(PROCEDURAL_PATTERNS)
+
+        if pattern == 'pit':
+            width = rng.randint(pit_lo, pit_hi)
+            obstacles.append({'type': 'pit', 'x': x, 'width': width})
+            # Coins along the jump over the pit
+            _coin_arc(coins, x - 20, x + width + 20, per_pattern, 60, 110)
+
+        elif pattern == 'block':
+            width = 40
+            height = rng.randint(block_lo, block_hi)
+            obstacles.append({'type': 'block', 'x': x, 'y': GROUND_Y - height, 'width': width, 'height': height})
+            _coin_arc(coins, x - 30, x + width + 30, per_pattern, height + 20, height + 45)
+
+        elif pattern == 'double_block':
+            # Two blocks with a landing gap between them
+            gap = 80
+            width = 40 + gap + 40
+            for bx in (x, x + 40 + gap):
+                height = rng.randint(block_lo, block_hi)
+                obstacles.append({'type': 'block', 'x': bx, 'y': GROUND_Y - height, 'width': 40, 'height': height})
+            _coin_arc(coins, x, x + width, per_pattern, block_hi + 25, block_hi + 40)
+
+        elif pattern == 'spike':
+            width = 40
+            height = block_lo
+            obstacles.append({'type': 'spike', 'x': x, 'y': GROUND_Y - height, 'width': width, 'height': height})
+            _coin_arc(coins, x - 30, x + width + 30, per_pattern, height + 40, height + 70)
+
+        elif pattern == 'enemy':
+            radius = 15
+            width = 2 * radius
+            obstacles.append({'type': 'enemy', 'x': x + radius, 'y': GROUND_Y - 30, 'radius': radius})
+            _coin_arc(coins, x - 20, x + width + 20, per_pattern, 70, 100)
+
+        else:
+            # Breather: a coin trail on the ground
+            width = 30 * (per_pattern + 2)
+            _coin_arc(coins, x, x + width, per_pattern + 2, 40, 40)
+
+        x += width + rng.randint(params['spacing_min'], params['spacing_max'])
+
+    # Coin run up to the goal
+    _coin_arc(coins, x, x + 25 * (2 * per_pattern - 1), 2 * per_pattern, 40, 40)
+    x += 25 * 2 * per_pattern + 100
+    goal_x = x + 50
+
+    return obstacles, coins, goal_x
@@ -0,0 +1,65 @@
+from mario_config import *
+
+
+class RollingWindow:
+    """Fixed-size ring buffer with a running sum, so append and mean are O(1)"""
+
+    def __init__(self, size):
+        self.size = size
+        self.values = [0.0] * size
+        self.count = 0
+        self.pos = 0
+        self.total = 0.0
+
+    def append(self, value):
+        if self.count == self.size:
+            self.total -= self.values[self.pos]
+        else:
+            self.count += 1
+        self.values[self.pos] = value
+        self.total += value
+        self.pos += 1
+        if self.pos == self.size:
+            # Re-sum once per wrap so float error from the running sum can't build up
+            self.pos = 0
+            self.total = float(sum(self.values))
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def __len__(self):
+        return self.count
+
+
+class RollingMetrics:
+    """Rolling win rate and score/coin/time averages shared by the trainer and evaluators
+
+    Keeps a long window (WIN_RATE_WINDOW, for win rate and summaries) and a
+    short one (PRINT_PROGRESS_EVERY, for progress lines) of every metric.
+    """
+
+    KEYS = ('win', 'score', 'coins', 'coin_pct', 'time')
+
+    def __init__(self, window=WIN_RATE_WINDOW, progress_window=PRINT_PROGRESS_EVERY):
+        self.window = {key: RollingWindow(window) for key in self.KEYS}
+        self.progress_window = {key: RollingWindow(progress_window) for key in self.KEYS}
+
+    def add(self, win, score, coins, coin_pct, time):
+        """Record one finished episode"""
+        values = {'win': 1.0 if win else 0.0, 'score': score, 'coins': coins,
+                  'coin_pct': coin_pct, 'time': time}
+        for key, value in values.items():
+            self.window[key].append(value)
+            self.progress_window[key].append(value)
+
+    def win_rate(self):
+        """Fraction of wins over the last WIN_RATE_WINDOW episodes (or all so far)"""
+        return self.window['win'].mean()
+
+    def mean(self, key):
+        """Average of a metric over the last WIN_RATE_WINDOW episodes"""
+        return self.window[key].mean()
+
+    def progress_mean(self, key):
+        """Average of a metric over the last PRINT_PROGRESS_EVERY episodes"""
+        return self.progress_window[key].mean()
@@ -0,0 +1,160 @@
+import os
+import random
+import signal
+import multiprocessing as mp
+import numpy as np
+from mario_config import *
+from mario_agent import QLearningAgent
+from mario_sim import MarioSim
+from mario_stats import TrainingStats, INTERRUPTED
+from mario_replay import TrajectoryRecorder
+
+
+def _worker_loop(conn, seed, epsilon_decay, record, level_id, trace_lambda):
+    """Worker process: run rounds of episodes on its own MarioSim and send back the learned tables"""
+    # Ctrl+C is handled by the parent, which ends the run and stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Separate streams for the env and the agent, both derived from the worker seed
+    seeder = random.Random(seed)
+    game = MarioSim(quiet=True, level_id=level_id, encode_states=True, seed=seeder.getrandbits(64))
+    agent = QLearningAgent(seed=seeder.getrandbits(64), trace_lambda=trace_lambda)
+    # Trajectories travel back with the results; the parent writes them in global order
+    recorder = TrajectoryRecorder(*record) if record else None
+
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        q_table, epsilon, episodes = task
+        agent.q_table[:] = q_table
+        agent.action_counts[:] = 0
+        agent.visited[:] = False
+        agent.epsilon = epsilon
+
+        results = []
+        for _ in range(episodes):
+            result = agent.run_episode(game, recorder)
+            # Each worker episode stands for num_workers episodes of the global schedule
+            agent.epsilon = max(EPSILON_MIN, agent.epsilon * epsilon_decay)
+            result['epsilon'] = agent.epsilon
+            results.append(result)
+
+        conn.send((agent.q_table, agent.action_counts, agent.visited, results))
+    conn.close()
+
+
+def merge_q_tables(base, q_tables, action_counts):
+    """Merge worker Q-tables into one, weighting each (state, action) by its worker visit counts
+
+    Entries no worker selected greedily (only explored) fall back to the mean
+    of the workers that changed them; untouched entries keep the base value.
+    """
+    q_tables = np.asarray(q_tables)
+    weights = np.asarray(action_counts, dtype=float)
+    total_weight = weights.sum(axis=0)
+
+    deltas = q_tables - base
+    changed = (deltas != 0).sum(axis=0)
+    mean_delta = deltas.sum(axis=0) / np.maximum(changed, 1)
+
+    weighted = (weights * q_tables).sum(axis=0) / np.maximum(total_weight, 1)
+    return np.where(total_weight > 0, weighted, base + mean_delta)
+
+
+class ParallelTrainer:
+    """Trains a QLearningAgent with worker processes, merging their Q-tables every sync_every episodes"""
+
+    def __init__(self, agent, num_workers=None, sync_every=PARALLEL_SYNC_EVERY, seed=None, level_id=CLASSIC_LEVEL):
+        self.agent = agent
+        self.level_id = level_id
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.sync_every = sync_every
+        self.seed = seed if seed is not None else random.randrange(2**31)
+
+    def train(self, episodes, stats_writer=None, recorder=None, stop_when=None):
+        """Train for a total of `episodes` episodes across all workers; returns the same stats as agent.train
+
+        A TrajectoryWriter passed as recorder receives every episode, in the same order as the stats.
+        stop_when works as in agent.train but is checked once per merge round. On
+        Ctrl+C the round in progress is dropped and the run ends with stop_reason
+        INTERRUPTED, keeping the Q-table from the last merge.
+        """
+        agent = self.agent
+        num_workers = self.num_workers
+        epsilon_decay = EPSILON_DECAY ** num_workers
+        record = (recorder.record_states, recorder.record_rewards) if recorder is not None else None
+
+        workers = []
+        for i in range(num_workers):
+            parent_conn, child_conn = mp.Pipe()
+            proc = mp.Process(target=_worker_loop,
+                              args=(child_conn, self.seed + i, epsilon_decay, record, self.level_id,
+                                    agent.trace_lambda), daemon=True)
+            proc.start()
+            child_conn.close()
+            workers.append((proc, parent_conn))
+
+        print(f" Parallel training: {num_workers} workers, merging every {self.sync_every} episodes per worker\n")
+        tracker = TrainingStats(stats_writer)
+        tracker.print_header()
+
+        remaining = episodes
+        busy = False
+        try:
+            while remaining > 0:
+                # Spread this round's episodes as evenly as possible over the workers
+                round_total = min(remaining, num_workers * self.sync_every)
+                counts = [round_total // num_workers + (1 if i < round_total % num_workers else 0)
+                          for i in range(num_workers)]
+
+                active = [(conn, n) for (_, conn), n in zip(workers, counts) if n > 0]
+                busy = True
+                for i, (conn, n) in enumerate(active):
+                    # Stagger the start epsilon so worker i plays global episode i of the round
+                    epsilon = max(EPSILON_MIN, agent.epsilon * EPSILON_DECAY ** i)
+                    conn.send((agent.q_table, epsilon, n))
+                replies = [conn.recv() for conn, _ in active]
+                busy = False
+
+                agent.q_table = merge_q_tables(agent.q_table,
+                                               [reply[0] for reply in replies],
+                                               [reply[1] for reply in replies])
+                for q_table, counts_delta, visited, _ in replies:
+                    agent.action_counts += counts_delta
+                    agent.visited |= visited
+
+                # Log episodes in global order: round-robin over the workers
+                results = [reply[3] for reply in replies]
+                for j in range(max(len(r) for r in results)):
+                    for worker_results in results:
+                        if j < len(worker_results):
+                            result = worker_results[j]
+                            if recorder is not None:
+                                recorder.write(result.pop('trajectory'))
+                            tracker.record(result)
+
+                for _ in range(round_total):
+                    agent.decay_epsilon()
+                remaining -= round_total
+
+                if stop_when is not None and remaining > 0:
+                    reason = stop_when(tracker)
+                    if reason:
+                        tracker.stop(reason)
+                        break
+        except KeyboardInterrupt:
+            tracker.stop(INTERRUPTED)
+        finally:
+            for proc, conn in workers:
+                if busy:
+                    # Mid-round: the workers' results are being discarded anyway
+                    proc.terminate()
+                else:
+                    try:
+                        conn.send(None)
+                    except (BrokenPipeError, OSError):
+                        pass
+                conn.close()
+                proc.join(timeout=5)
+
+        return tracker.finish(agent.num_visited_states, agent.epsilon)
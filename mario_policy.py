@@ -0,0 +1,140 @@
+import json
+import os
+import struct
+import sys
+import numpy as np
+from mario_config import *
+from mario_metrics import RollingMetrics
+from mario_state import NUM_STATES, encode_state
+
+# Frozen greedy policies (.pol), little-endian:
+#
+#   magic       8 bytes  b'MARIOPL\0'
+#   version     uint32
+#   num_states  uint32
+#   num_actions uint32
+#   schema_len  uint32   followed by STATE_SPACE as UTF-8 JSON
+#   actions     uint8[num_states]   greedy action of every encoded state
+#
+# A policy is the argmax of a Q-table with ties broken by TIE_BREAK_ORDER, so
+# compiling the same table always gives the same file.
+
+MAGIC = b'MARIOPL\0'
+VERSION = 1
+_HEADER = struct.Struct('<8sIIII')
+
+# Among equally good actions prefer moving forward, then jumping, then standing still
+TIE_BREAK_ORDER = (2, 4, 3, 0, 5, 1)
+
+
+def compile_q_table(q_table):
+    """Greedy action of every state as a uint8 array (ties go to the earliest action in TIE_BREAK_ORDER)"""
+    order = np.array(TIE_BREAK_ORDER)
+    return order[np.asarray(q_table)[:, order].argmax(axis=1)].astype(np.uint8)
+
+
+class FrozenPolicy:
+    """Read-only greedy policy: one table lookup per action, no exploration, no bookkeeping
+
+    Drop-in for QLearningAgent wherever only get_action(state, explore=False)
+    is used (run_ai, replay/video recording, evaluation).
+    """
+
+    def __init__(self, actions):
+        actions = np.array(actions, dtype=np.uint8)
+        if actions.shape != (NUM_STATES,):
+            raise ValueError(f"policy has {actions.shape} actions, expected ({NUM_STATES},)")
+        actions.setflags(write=False)
+        self.actions = actions
+        # Indexing a list gives a plain int and is several times cheaper than indexing NumPy
+        self._lookup = actions.tolist()
+
+    @classmethod
+    def from_q_table(cls, q_table):
+        return cls(compile_q_table(q_table))
+
+    @classmethod
+    def from_agent(cls, agent):
+        return cls.from_q_table(agent.q_table)
+
+    def get_action(self, state, explore=False):
+        """Greedy action for a state tuple or encoded index (explore is ignored)"""
+        if type(state) is tuple:
+            state = encode_state(state)
+        return self._lookup[state]
+
+    def evaluate(self, game, episodes):
+        return evaluate_policy(self, game, episodes)
+
+    def save(self, filename):
+        schema = json.dumps(STATE_SPACE, separators=(',', ':')).encode('utf-8')
+        tmp = filename + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, NUM_STATES, NUM_ACTIONS, len(schema)))
+            f.write(schema)
+            f.write(self.actions.tobytes())
+        os.replace(tmp, filename)
+        print(f" Policy saved: {filename} ({NUM_STATES} states, {os.path.getsize(filename)} bytes)")
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, 'rb') as f:
+            data = f.read()
+        if len(data) < _HEADER.size:
+            raise ValueError(f"{filename}: not a policy file")
+        magic, version, num_states, num_actions, schema_len = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{filename}: not a policy file")
+        if version != VERSION:
+            raise ValueError(f"{filename}: unsupported policy version {version}")
+        offset = _HEADER.size + schema_len
+        schema = json.loads(data[_HEADER.size:offset].decode('utf-8'))
+        if schema != STATE_SPACE or num_states != NUM_STATES or num_actions != NUM_ACTIONS:
+            raise ValueError(f"{filename}: state encoding doesn't match this version of the game")
+        return cls(np.frombuffer(data, dtype=np.uint8, count=num_states, offset=offset))
+
+
+def load_policy(filename):
+    """Load a .pol policy, or compile one from a Q-table checkpoint (.qtb or legacy .json)"""
+    if filename.endswith('.pol'):
+        return FrozenPolicy.load(filename)
+    from mario_checkpoint import load_checkpoint, load_legacy_json
+    if filename.endswith('.json'):
+        checkpoint, _ = load_legacy_json(filename)
+    else:
+        checkpoint = load_checkpoint(filename, mmap=True)
+    return FrozenPolicy.from_q_table(checkpoint.q_table)
+
+
+def evaluate_policy(policy, game, episodes):
+    """Play greedy episodes without learning; returns win rate and average score/coins/time"""
+    metrics = RollingMetrics(window=max(1, episodes))
+    perfect_runs = 0
+    for _ in range(episodes):
+        state = game.reset()
+        done = False
+        while not done:
+            state, _, done = game.step(policy.get_action(state, explore=False))
+        coin_pct = (game.coins_collected / game.total_coins * 100) if game.total_coins > 0 else 0
+        metrics.add(game.win, game.score, game.coins_collected, coin_pct, game.time_taken)
+        if game.win and game.coins_collected == game.total_coins:
+            perfect_runs += 1
+
+    return {
+        'episodes': episodes,
+        'win_rate': metrics.win_rate(),
+        'avg_score': metrics.mean('score'),
+        'avg_coins': metrics.mean('coins'),
+        'avg_coin_pct': metrics.mean('coin_pct'),
+        'avg_time': metrics.mean('time'),
+        'perfect_runs': perfect_runs
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python mario_policy.py q_table.qtb [policy.pol]")
+        sys.exit(1)
+    source = sys.argv[1]
+    output = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(source)[0] + '.pol'
+    load_policy(source).save(output)
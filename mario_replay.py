@@ -0,0 +1,363 @@
+import argparse
+import mmap
+import os
+import struct
+import numpy as np
+from mario_config import *
+from mario_sim import MarioSim
+from mario_state import encode_state
+
+# Trajectory files (.traj) hold any number of episodes, little-endian:
+#
+#   magic       8 bytes  b'MARIOTR\0'
+#   version     uint32
+#   then one record per episode:
+#     episode      uint32
+#     level_id     uint32   (uint16 before version 3)
+#     level_seed   uint64
+#     num_patterns uint32   procedural level length, 0 = the level's default (not in version 1)
+#     steps        uint32   (uint16 before version 3; long procedural levels run past 65535)
+#     flags        uint8    bit 0: states stored, bit 1: rewards stored
+#     win          uint8
+#     score        int32
+#     actions      uint8[steps]
+#     states       uint16[steps + 1]   encoded states, initial state first (if flagged)
+#     rewards      float32[steps]      (if flagged)
+#
+# The simulation is deterministic given the level and the actions, so the
+# actions alone are enough to rebuild every frame: a full-length classic
+# episode is about 1.2 KB.
+
+MAGIC = b'MARIOTR\0'
+VERSION = 3
+_FILE_HEADER = struct.Struct('<8sI')
+_RECORD = struct.Struct('<IIQIIBBi')
+_RECORDS = {1: struct.Struct('<IHQHBBi'), 2: struct.Struct('<IHQIHBBi'), 3: _RECORD}
+HAS_STATES = 1
+HAS_REWARDS = 2
+
+
+class Trajectory:
+    """One recorded episode: the level it was played on and the actions taken"""
+
+    def __init__(self, level_id, level_seed, actions, states=None, rewards=None, episode=0, win=False, score=0,
+                 num_patterns=None):
+        self.level_id = level_id
+        self.level_seed = level_seed
+        self.num_patterns = num_patterns
+        self.actions = bytes(actions)
+        self.states = states
+        self.rewards = rewards
+        self.episode = episode
+        self.win = win
+        self.score = score
+
+    def __len__(self):
+        return len(self.actions)
+
+
+class TrajectoryRecorder:
+    """Collects the actions (and optionally states and rewards) of the episode being played
+
+    Call begin() after game.reset(), step() after every game.step() and end()
+    when the episode is done; end() returns the finished Trajectory.
+    """
+
+    def __init__(self, record_states=False, record_rewards=False):
+        self.record_states = record_states
+        self.record_rewards = record_rewards
+        self._game = None
+
+    def begin(self, game, state):
+        self._game = game
+        self._actions = bytearray()
+        self._states = [self._encode(state)] if self.record_states else None
+        self._rewards = [] if self.record_rewards else None
+
+    def _encode(self, state):
+        return encode_state(state) if type(state) is tuple else state
+
+    def step(self, action, state, reward):
+        self._actions.append(action)
+        if self._states is not None:
+            self._states.append(self._encode(state))
+        if self._rewards is not None:
+            self._rewards.append(reward)
+
+    def end(self):
+        game = self._game
+        self._game = None
+        states = np.array(self._states, dtype='<u2') if self._states is not None else None
+        rewards = np.array(self._rewards, dtype='<f4') if self._rewards is not None else None
+        return Trajectory(game.level_id, game.layout_seed, self._actions, states, rewards,
+                          win=game.win, score=game.score, num_patterns=game.num_patterns)
+
+
+class TrajectoryWriter(TrajectoryRecorder):
+    """TrajectoryRecorder that appends every finished episode to a trajectory file"""
+
+    def __init__(self, filename, record_states=False, record_rewards=False):
+        super().__init__(record_states, record_rewards)
+        self.filename = filename
+        self.episodes = 0
+        self._file = open(filename, 'wb')
+        self._file.write(_FILE_HEADER.pack(MAGIC, VERSION))
+
+    def end(self):
+        trajectory = super().end()
+        self.write(trajectory)
+        return trajectory
+
+    def write(self, trajectory):
+        """Append a trajectory (numbered in write order)"""
+        flags = 0
+        if trajectory.states is not None:
+            flags |= HAS_STATES
+        if trajectory.rewards is not None:
+            flags |= HAS_REWARDS
+        f = self._file
+        f.write(_RECORD.pack(self.episodes, trajectory.level_id, trajectory.level_seed, trajectory.num_patterns or 0,
+                             len(trajectory.actions), flags, trajectory.win, int(trajectory.score)))
+        f.write(trajectory.actions)
+        if trajectory.states is not None:
+            f.write(np.ascontiguousarray(trajectory.states, dtype='<u2').tobytes())
+        if trajectory.rewards is not None:
+            f.write(np.ascontiguousarray(trajectory.rewards, dtype='<f4').tobytes())
+        trajectory.episode = self.episodes
+        self.episodes += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryReader:
+    """Random access to the episodes of a trajectory file (only record headers are scanned on open)"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(filename) else b''
+        data = self._data
+        if len(data) < _FILE_HEADER.size:
+            raise ValueError(f"{filename}: not a trajectory file")
+        magic, version = _FILE_HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{filename}: not a trajectory file")
+        if version not in _RECORDS:
+            raise ValueError(f"{filename}: unsupported trajectory version {version}")
+        self.version = version
+        record = self._record = _RECORDS[version]
+
+        self._offsets = []
+        offset = _FILE_HEADER.size
+        while offset + record.size <= len(data):
+            fields = record.unpack_from(data, offset)
+            steps, flags = fields[-4], fields[-3]
+            size = record.size + steps
+            if flags & HAS_STATES:
+                size += 2 * (steps + 1)
+            if flags & HAS_REWARDS:
+                size += 4 * steps
+            if offset + size > len(data):
+                break  # partly written last record
+            self._offsets.append(offset)
+            offset += size
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, index):
+        data = self._data
+        offset = self._offsets[index]
+        fields = self._record.unpack_from(data, offset)
+        if self.version == 1:
+            episode, level_id, level_seed, steps, flags, win, score = fields
+            num_patterns = 0
+        else:
+            episode, level_id, level_seed, num_patterns, steps, flags, win, score = fields
+        offset += self._record.size
+        actions = data[offset:offset + steps]
+        offset += steps
+        states = rewards = None
+        if flags & HAS_STATES:
+            states = np.frombuffer(data, dtype='<u2', count=steps + 1, offset=offset).copy()
+            offset += 2 * (steps + 1)
+        if flags & HAS_REWARDS:
+            rewards = np.frombuffer(data, dtype='<f4', count=steps, offset=offset).copy()
+        return Trajectory(level_id, level_seed, actions, states, rewards, episode, bool(win), score,
+                          num_patterns or None)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _start(trajectory, game):
+    if game is None:
+        game = MarioSim(quiet=True, level_id=trajectory.level_id, level_seed=trajectory.level_seed,
+                        num_patterns=trajectory.num_patterns)
+    game.level_id = trajectory.level_id
+    game.level_seed = trajectory.level_seed
+    game.num_patterns = trajectory.num_patterns
+    return game, game.reset()
+
+
+def replay(trajectory, game=None):
+    """Re-simulate a trajectory at full speed, yielding (game, state, reward, done) after every action"""
+    game, state = _start(trajectory, game)
+    for action in trajectory.actions:
+        state, reward, done = game.step(action)
+        yield game, state, reward, done
+
+
+def seek(trajectory, step, game=None):
+    """Return the game as it was after the first `step` actions of the trajectory"""
+    game, _ = _start(trajectory, game)
+    for action in trajectory.actions[:step]:
+        game.step(action)
+    return game
+
+
+def verify(trajectory):
+    """Re-simulate and check against the stored states, rewards and outcome; returns the first bad step or None"""
+    game, state = _start(trajectory, MarioSim(quiet=True, encode_states=True))
+    if trajectory.states is not None and trajectory.states[0] != state:
+        return 0
+    for i, (_, state, reward, _) in enumerate(replay(trajectory, game)):
+        if trajectory.states is not None and trajectory.states[i + 1] != state:
+            return i + 1
+        if trajectory.rewards is not None and trajectory.rewards[i] != np.float32(reward):
+            return i + 1
+    if game.win != trajectory.win or game.score != trajectory.score:
+        return len(trajectory)
+    return None
+
+
+def export(reader, indices, output):
+    """Copy the selected episodes of a trajectory file into a new one"""
+    with TrajectoryWriter(output) as writer:
+        for index in indices:
+            writer.write(reader[index])
+    print(f" Exported {len(indices)} episodes to {output}")
+
+
+def watch(reader, indices):
+    """Play recorded episodes back in a window
+
+    SPACE pauses, LEFT/RIGHT seek one second, F toggles uncapped speed,
+    N skips to the next episode, ESC quits.
+    """
+    import pygame
+    from mario_env import MarioGame
+    game = MarioGame(quiet=True)
+    fast = False
+
+    try:
+        for index in indices:
+            trajectory = reader[index]
+            print(f"Episode {trajectory.episode}: {'WIN' if trajectory.win else 'LOSE'} | "
+                  f"Steps: {len(trajectory)} | Score: {trajectory.score}")
+            seek(trajectory, 0, game)
+            step = 0
+            paused = False
+            while True:
+                target = None
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        return
+                    if event.type == pygame.KEYDOWN:
+                        if event.key == pygame.K_ESCAPE:
+                            return
+                        if event.key == pygame.K_SPACE:
+                            paused = not paused
+                        elif event.key == pygame.K_f:
+                            fast = not fast
+                        elif event.key == pygame.K_n:
+                            target = len(trajectory) + 1
+                        elif event.key == pygame.K_RIGHT:
+                            target = min(len(trajectory), step + FPS)
+                        elif event.key == pygame.K_LEFT:
+                            target = max(0, step - FPS)
+
+                if target is not None:
+                    if target > len(trajectory):
+                        break
+                    if target < step:
+                        seek(trajectory, target, game)
+                    else:
+                        for action in trajectory.actions[step:target]:
+                            game.step(action)
+                    step = target
+                elif not paused and step < len(trajectory):
+                    game.step(trajectory.actions[step])
+                    step += 1
+
+                game.render()
+                if step >= len(trajectory) and not paused:
+                    pygame.time.wait(1000)
+                    break
+                if not fast:
+                    game.clock.tick(FPS)
+    finally:
+        pygame.quit()
+
+
+def _select(reader, args):
+    if args.episodes:
+        return args.episodes
+    if args.wins:
+        return [i for i in range(len(reader)) if reader[i].win]
+    return list(range(len(reader)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded Mario episodes")
+    parser.add_argument('file', help="trajectory file (.traj)")
+    parser.add_argument('-e', '--episodes', type=int, nargs='+', help="episode indices (default: all)")
+    parser.add_argument('--wins', action='store_true', help="only episodes that reached the goal")
+    parser.add_argument('--list', action='store_true', help="list the episodes and exit")
+    parser.add_argument('--verify', action='store_true', help="re-simulate and check stored states/rewards")
+    parser.add_argument('--export', metavar='OUT', help="copy the selected episodes to another trajectory file")
+    args = parser.parse_args(argv)
+
+    with TrajectoryReader(args.file) as reader:
+        indices = _select(reader, args)
+        if args.list:
+            print(f"{'Index':<8}{'Episode':<10}{'Level':<8}{'Seed':<8}{'Steps':<8}{'Result':<8}{'Score':<8}")
+            for i in indices:
+                t = reader[i]
+                print(f"{i:<8}{t.episode:<10}{t.level_id:<8}{t.level_seed:<8}{len(t):<8}"
+                      f"{'WIN' if t.win else 'LOSE':<8}{t.score:<8}")
+        elif args.verify:
+            bad = 0
+            for i in indices:
+                step = verify(reader[i])
+                if step is not None:
+                    bad += 1
+                    print(f" Episode {i} diverges at step {step}")
+            print(f" {len(indices) - bad}/{len(indices)} episodes replay exactly")
+        elif args.export:
+            export(reader, indices, args.export)
+        else:
+            watch(reader, indices)
+
+
+if __name__ == "__main__":
+    main()
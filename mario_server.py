@@ -0,0 +1,406 @@
+import argparse
+import asyncio
+import os
+import random
+import signal
+import socket
+import struct
+import sys
+import time
+import numpy as np
+from mario_config import *
+from mario_policy import load_policy
+from mario_state import NUM_STATES, STATE_RADICES
+
+# Policy server protocol over a Unix stream socket, little-endian. Every
+# request and response starts with the same 3-byte header:
+#
+#   kind   uint8    request: MSG_IDS / MSG_TUPLES / MSG_RELOAD, response: STATUS_OK / STATUS_ERROR
+#   count  uint16
+#
+# then the payload:
+#
+#   MSG_IDS       count x uint16      encoded state ids (see mario_state.encode_state)
+#   MSG_TUPLES    count x 6 x uint8   raw state tuples
+#   MSG_RELOAD    count bytes         UTF-8 path of a new checkpoint, empty to re-read the current one
+#   STATUS_OK     count x uint8       one action per requested state (count 0 for a reload)
+#   STATUS_ERROR  count bytes         UTF-8 error message
+#
+# Responses on a connection come back in request order.
+
+MSG_IDS = 0
+MSG_TUPLES = 1
+MSG_RELOAD = 2
+STATUS_OK = 0
+STATUS_ERROR = 1
+_HEADER = struct.Struct('<BH')
+MAX_BATCH = 0xFFFF
+
+# Per state-tuple field: value -> digit lookup table (-1 for values outside STATE_SPACE)
+_DIGIT_TABLES = []
+for _values in STATE_SPACE.values():
+    _table = np.full(256, -1, dtype=np.int64)
+    _table[_values] = np.arange(len(_values))
+    _DIGIT_TABLES.append(_table)
+
+
+def encode_tuples(fields):
+    """Vectorized encode_state for a (n, 6) uint8 array; returns None if any tuple is invalid"""
+    index = np.zeros(len(fields), dtype=np.int64)
+    for column, (table, radix) in enumerate(zip(_DIGIT_TABLES, STATE_RADICES)):
+        digits = table[fields[:, column]]
+        if (digits < 0).any():
+            return None
+        index = index * radix + digits
+    return index
+
+
+class PolicyServer:
+    """Serves one frozen policy to many clients, coalescing concurrent requests into micro-batches
+
+    Requests that arrive in the same event-loop iteration (or within
+    batch_delay seconds, if set) are answered by one vectorized table lookup.
+    The checkpoint can be swapped at any time (reload(), SIGHUP, a MSG_RELOAD
+    request, or watch=True to follow its modification time) without dropping
+    connections: batches after the swap simply use the new policy.
+    """
+
+    def __init__(self, model, socket_path=SERVER_SOCKET, batch_size=SERVER_BATCH_SIZE,
+                 batch_delay=SERVER_BATCH_DELAY, watch=False):
+        self.model = model
+        self.socket_path = socket_path
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.watch = watch
+        self.policy = load_policy(model)
+        self._mtime = os.path.getmtime(model)
+        self._pending = []
+        self._pending_states = 0
+        self._flush_handle = None
+        self.requests = 0
+        self.batches = 0
+
+    def _submit(self, ids):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((ids, future))
+        self._pending_states += len(ids)
+        if self._pending_states >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            if self.batch_delay > 0:
+                self._flush_handle = loop.call_later(self.batch_delay, self._flush)
+            else:
+                self._flush_handle = loop.call_soon(self._flush)
+        return future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending = self._pending
+        if not pending:
+            return
+        self._pending = []
+        self._pending_states = 0
+
+        if len(pending) == 1:
+            actions = self.policy.actions[pending[0][0]].tobytes()
+        else:
+            actions = self.policy.actions[np.concatenate([ids for ids, _ in pending])].tobytes()
+        # One lookup for the whole batch; each request gets its slice of the bytes
+        start = 0
+        for ids, future in pending:
+            end = start + len(ids)
+            if not future.done():
+                future.set_result(actions[start:end])
+            start = end
+        self.requests += len(pending)
+        self.batches += 1
+
+    async def reload(self, model=None):
+        """Load a new checkpoint (off the event loop) and switch to it"""
+        model = model or self.model
+        policy = await asyncio.get_running_loop().run_in_executor(None, load_policy, model)
+        self.policy = policy
+        self.model = model
+        self._mtime = os.path.getmtime(model)
+        print(f" Reloaded policy from {model}")
+
+    async def _reload_logged(self, model=None):
+        try:
+            await self.reload(model)
+        except (OSError, ValueError) as e:
+            print(f" Reload failed, keeping the current policy: {e}")
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(SERVER_WATCH_INTERVAL)
+            try:
+                mtime = os.path.getmtime(self.model)
+            except OSError:
+                continue
+            if mtime != self._mtime:
+                await self._reload_logged()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                kind, count = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+                error = None
+                if kind == MSG_IDS:
+                    ids = np.frombuffer(await reader.readexactly(2 * count), dtype='<u2').astype(np.intp)
+                    if count and ids.max() >= NUM_STATES:
+                        error = f"state id out of range (0..{NUM_STATES - 1})"
+                elif kind == MSG_TUPLES:
+                    fields = np.frombuffer(await reader.readexactly(len(STATE_RADICES) * count), dtype=np.uint8)
+                    ids = encode_tuples(fields.reshape(count, len(STATE_RADICES)))
+                    if ids is None:
+                        error = "state tuple outside STATE_SPACE"
+                elif kind == MSG_RELOAD:
+                    path = (await reader.readexactly(count)).decode('utf-8') or None
+                    try:
+                        await self.reload(path)
+                    except (OSError, ValueError) as e:
+                        error = f"reload failed: {e}"
+                    else:
+                        writer.write(_HEADER.pack(STATUS_OK, 0))
+                        await writer.drain()
+                        continue
+                else:
+                    # The payload length is unknown, so the stream can't be resynced
+                    message = f"unknown request kind {kind}".encode('utf-8')
+                    writer.write(_HEADER.pack(STATUS_ERROR, len(message)) + message)
+                    await writer.drain()
+                    break
+
+                if error is None:
+                    actions = await self._submit(ids)
+                    writer.write(_HEADER.pack(STATUS_OK, len(actions)) + actions)
+                else:
+                    message = error.encode('utf-8')
+                    writer.write(_HEADER.pack(STATUS_ERROR, len(message)) + message)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.ensure_future(self._reload_logged()))
+        except (NotImplementedError, AttributeError, RuntimeError):
+            pass  # no SIGHUP here; MSG_RELOAD and --watch still work
+        watcher = asyncio.ensure_future(self._watch()) if self.watch else None
+        print(f" Serving {self.model} on {self.socket_path} (pid {os.getpid()}, SIGHUP reloads)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            print(f" Served {self.requests} requests in {self.batches} batches")
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+
+def _request(kind, states):
+    if kind == MSG_RELOAD:
+        payload = (states or '').encode('utf-8')
+        return _HEADER.pack(kind, len(payload)) + payload
+    if len(states) > MAX_BATCH:
+        raise ValueError(f"at most {MAX_BATCH} states per request")
+    if kind == MSG_TUPLES:
+        return _HEADER.pack(kind, len(states)) + np.asarray(states, dtype=np.uint8).tobytes()
+    return _HEADER.pack(kind, len(states)) + np.asarray(states, dtype='<u2').tobytes()
+
+
+def _kind(states):
+    return MSG_TUPLES if len(states) and type(states[0]) is tuple else MSG_IDS
+
+
+class PolicyClient:
+    """Blocking client; get_action(state) makes it a drop-in for QLearningAgent in run_ai and friends"""
+
+    def __init__(self, socket_path=SERVER_SOCKET):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(socket_path)
+
+    def _recv(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("policy server closed the connection")
+            data += chunk
+        return bytes(data)
+
+    def _call(self, message):
+        self.sock.sendall(message)
+        status, count = _HEADER.unpack(self._recv(_HEADER.size))
+        payload = self._recv(count)
+        if status != STATUS_OK:
+            raise RuntimeError(payload.decode('utf-8'))
+        return payload
+
+    def get_actions(self, states):
+        """Actions for a list of state tuples or encoded ids"""
+        return list(self._call(_request(_kind(states), states)))
+
+    def get_action(self, state, explore=False):
+        return self.get_actions([state])[0]
+
+    def reload(self, model=None):
+        """Ask the server to switch to another checkpoint (or re-read its current one)"""
+        self._call(_request(MSG_RELOAD, model))
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncPolicyClient:
+    """asyncio version of PolicyClient (one request in flight per connection)"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, socket_path=SERVER_SOCKET):
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        return cls(reader, writer)
+
+    async def _call(self, message):
+        self.writer.write(message)
+        await self.writer.drain()
+        status, count = _HEADER.unpack(await self.reader.readexactly(_HEADER.size))
+        payload = await self.reader.readexactly(count)
+        if status != STATUS_OK:
+            raise RuntimeError(payload.decode('utf-8'))
+        return payload
+
+    async def get_actions(self, states):
+        return list(await self._call(_request(_kind(states), states)))
+
+    async def reload(self, model=None):
+        await self._call(_request(MSG_RELOAD, model))
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def load_test(socket_path=SERVER_SOCKET, clients=32, requests=2000, batch=1, seed=0):
+    """Hammer a running server from `clients` concurrent connections; returns latency percentiles in microseconds"""
+    rng = random.Random(seed)
+    connections = [await AsyncPolicyClient.connect(socket_path) for _ in range(clients)]
+    latencies = []
+
+    async def worker(client, ids):
+        for request in ids:
+            start = time.perf_counter()
+            await client.get_actions(request)
+            latencies.append(time.perf_counter() - start)
+
+    work = [[[rng.randrange(NUM_STATES) for _ in range(batch)] for _ in range(requests)] for _ in range(clients)]
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(client, ids) for client, ids in zip(connections, work)))
+    elapsed = time.perf_counter() - start
+    for client in connections:
+        await client.close()
+
+    latencies = np.array(latencies) * 1e6
+    return {
+        'requests': len(latencies),
+        'requests_per_sec': len(latencies) / elapsed,
+        'states_per_sec': len(latencies) * batch / elapsed,
+        'p50_us': float(np.percentile(latencies, 50)),
+        'p99_us': float(np.percentile(latencies, 99)),
+        'max_us': float(latencies.max())
+    }
+
+
+def _run_server(model_path, socket_path):
+    """Child-process entry point for _serve_in_background (module level so it pickles under spawn)"""
+    try:
+        asyncio.run(PolicyServer(model_path, socket_path).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+def _serve_in_background(model_path, socket_path):
+    """Start a server in a child process and wait until its socket accepts connections"""
+    import multiprocessing as mp
+    proc = mp.Process(target=_run_server, args=(model_path, socket_path), daemon=True)
+    proc.start()
+    deadline = time.time() + 10
+    while time.time() < deadline and proc.is_alive():
+        try:
+            PolicyClient(socket_path).close()
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.terminate()
+    raise RuntimeError("policy server did not start")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # serve is the default command: `mario_server.py --model q.qtb` runs the server
+    if not argv or argv[0] not in ('serve', 'bench', 'reload', '-h', '--help'):
+        argv = ['serve'] + argv
+    parser = argparse.ArgumentParser(description="Serve a trained Mario policy over a Unix socket")
+    commands = parser.add_subparsers(dest='command', required=True)
+    p = commands.add_parser('serve', help="run the policy server")
+    p.add_argument('--model', default="q_table.qtb", help="Q-table (.qtb/.json) or .pol policy (default q_table.qtb)")
+    p.add_argument('--socket', default=SERVER_SOCKET, help=f"socket path (default {SERVER_SOCKET})")
+    p.add_argument('--batch-size', type=int, default=SERVER_BATCH_SIZE,
+                   help=f"states per micro-batch before it is answered right away (default {SERVER_BATCH_SIZE})")
+    p.add_argument('--batch-delay', type=float, default=SERVER_BATCH_DELAY,
+                   help="seconds to wait for more requests before answering a batch (default: one loop iteration)")
+    p.add_argument('--watch', action='store_true', help="reload automatically when the model file changes")
+    p = commands.add_parser('bench', help="load-test a server and report p50/p99 latency")
+    p.add_argument('--socket', default=SERVER_SOCKET, help=f"socket path (default {SERVER_SOCKET})")
+    p.add_argument('--model', help="start a server for this model first (otherwise one must be running)")
+    p.add_argument('--clients', type=int, default=32, help="concurrent connections (default 32)")
+    p.add_argument('--requests', type=int, default=2000, help="requests per connection (default 2000)")
+    p.add_argument('--batch', type=int, default=1, help="states per request (default 1)")
+    p = commands.add_parser('reload', help="tell a running server to reload its checkpoint")
+    p.add_argument('model', nargs='?', help="new checkpoint (default: re-read the current one)")
+    p.add_argument('--socket', default=SERVER_SOCKET, help=f"socket path (default {SERVER_SOCKET})")
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        server = PolicyServer(args.model, args.socket, args.batch_size, args.batch_delay, args.watch)
+        try:
+            asyncio.run(server.serve())
+        except KeyboardInterrupt:
+            pass
+    elif args.command == 'reload':
+        with PolicyClient(args.socket) as client:
+            client.reload(args.model)
+        print(f" Reloaded {args.model or 'current checkpoint'}")
+    else:
+        proc = _serve_in_background(args.model, args.socket) if args.model else None
+        try:
+            results = asyncio.run(load_test(args.socket, args.clients, args.requests, args.batch))
+        finally:
+            if proc is not None:
+                proc.terminate()
+        print(f" {results['requests']} requests from {args.clients} clients ({args.batch} states each)")
+        print(f" {results['requests_per_sec']:,.0f} requests/s, {results['states_per_sec']:,.0f} states/s")
+        print(f" latency p50 {results['p50_us']:.0f} us, p99 {results['p99_us']:.0f} us, max {results['max_us']:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
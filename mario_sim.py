@@ -0,0 +1,315 @@
+import random
+from bisect import bisect_right
+from collections import namedtuple
+from mario_config import *
+from mario_level import get_level
+from mario_state import encode_state
+
+# Everything that changes during an episode; the compiled level is shared by reference
+Snapshot = namedtuple('Snapshot', [
+    'level', 'layout_seed', 'player_x', 'player_y', 'player_vy', 'is_jumping', 'game_over', 'win',
+    'score', 'coins_collected', 'steps', 'max_x', 'camera_x', 'coin_collected',
+])
+
+
+class MarioSim:
+    """Headless Mario simulation core (level, physics, state) with no pygame dependency"""
+    
+    def __init__(self, quiet=False, level_id=CLASSIC_LEVEL, level_seed=None, encode_states=False, seed=None,
+                 num_patterns=None):
+        self.quiet = quiet
+        self.num_patterns = num_patterns
+        # Own generator, so episodes don't depend on (or disturb) the global random state
+        self.rng = random.Random(seed)
+        self.encode_states = encode_states
+        self.level_id = level_id
+        self.level_seed = level_seed
+        self.camera_x = 0
+        self.best_time = float('inf')
+        self.best_score = 0
+        self.reset()
+    
+    def reset(self, seed=None):
+        """Reset game state (a seed re-seeds the env's generator, making the following episodes reproducible)"""
+        if seed is not None:
+            self.rng.seed(seed)
+        self.player_x = 100
+        self.player_y = GROUND_Y - PLAYER_SIZE
+        self.player_vy = 0
+        self.is_jumping = False
+        self.game_over = False
+        self.win = False
+        self.score = 0
+        self.coins_collected = 0
+        self.total_coins = 0
+        self.steps = 0
+        self.time_taken = 0
+        self.max_x = 100
+        
+        # Compiled layouts are cached, so only the collected-coin mask is rebuilt here
+        seed = self.level_seed if self.level_seed is not None else self.rng.randrange(LEVEL_SEED_POOL)
+        self.layout_seed = seed  # with the actions taken, enough to replay the episode
+        self.level = get_level(self.level_id, seed, quiet=self.quiet, num_patterns=self.num_patterns)
+        self.obstacles = self.level.obstacles
+        self.goal_x = self.level.goal_x
+        self.total_coins = self.level.num_coins
+        self.coin_collected = bytearray(self.total_coins)
+        
+        return self._get_state()
+    
+    def get_snapshot(self):
+        """Capture the mid-episode state (best time/score records are not part of it)"""
+        return Snapshot(self.level, self.layout_seed, self.player_x, self.player_y, self.player_vy,
+                        self.is_jumping, self.game_over, self.win, self.score, self.coins_collected,
+                        self.steps, self.max_x, self.camera_x, bytes(self.coin_collected))
+    
+    def restore_snapshot(self, snapshot):
+        """Return to a state taken with get_snapshot (from this or any other env) and return its observation"""
+        level = snapshot.level
+        self.level = level
+        self.layout_seed = snapshot.layout_seed
+        self.obstacles = level.obstacles
+        self.goal_x = level.goal_x
+        self.total_coins = level.num_coins
+        self.player_x = snapshot.player_x
+        self.player_y = snapshot.player_y
+        self.player_vy = snapshot.player_vy
+        self.is_jumping = snapshot.is_jumping
+        self.game_over = snapshot.game_over
+        self.win = snapshot.win
+        self.score = snapshot.score
+        self.coins_collected = snapshot.coins_collected
+        self.steps = snapshot.steps
+        self.time_taken = snapshot.steps / FPS
+        self.max_x = snapshot.max_x
+        self.camera_x = snapshot.camera_x
+        self.coin_collected = bytearray(snapshot.coin_collected)
+        return self._get_state()
+    
+    def _get_state(self):
+        """Get detailed state representation for AI"""
+        # Find nearest obstacle ahead
+        nearest_obstacle = None
+        min_dist = float('inf')
+        
+        level = self.level
+        k = bisect_right(level.obs_xs, self.player_x - 20)
+        if k < len(level.obs_xs):
+            nearest_obstacle = self.obstacles[level.obs_order[k]]
+            min_dist = nearest_obstacle['x'] - self.player_x
+        
+        # Find nearest uncollected coin (first one in level order within the window)
+        nearest_coin_dist = 8
+        nearest_coin_height = 0
+        for i in level.between(level.coin_xs, level.coin_order, self.player_x - 10, self.player_x + 200):
+            if not self.coin_collected[i]:
+                coin_dist = level.coin_x[i] - self.player_x
+                if coin_dist < 50:
+                    nearest_coin_dist = 0
+                elif coin_dist < 100:
+                    nearest_coin_dist = 1
+                elif coin_dist < 150:
+                    nearest_coin_dist = 2
+                
+                # Check coin height
+                coin_y = level.coin_y[i]
+                if coin_y < GROUND_Y - 100:
+                    nearest_coin_height = 2  # High
+                elif coin_y < GROUND_Y - 60:
+                    nearest_coin_height = 1  # Medium
+                else:
+                    nearest_coin_height = 0  # Low
+                break
+        
+        # State representation
+        if nearest_obstacle is None:
+            obstacle_type = 0
+            distance_bucket = 8
+            obstacle_width = 0
+        else:
+            type_map = {'pit': 1, 'block': 2, 'spike': 3, 'enemy': 4}
+            obstacle_type = type_map.get(nearest_obstacle['type'], 0)
+            
+            if min_dist < 30:
+                distance_bucket = 0
+            elif min_dist < 60:
+                distance_bucket = 1
+            elif min_dist < 100:
+                distance_bucket = 2
+            elif min_dist < 150:
+                distance_bucket = 3
+            elif min_dist < 200:
+                distance_bucket = 4
+            else:
+                distance_bucket = 5
+            
+            if nearest_obstacle['type'] == 'pit':
+                obstacle_width = 1 if nearest_obstacle['width'] > 70 else 0
+            elif nearest_obstacle['type'] == 'enemy':
+                obstacle_width = 1
+            else:
+                obstacle_width = 0
+        
+        if not self.is_jumping:
+            jump_state = 0
+        elif self.player_vy < -5:
+            jump_state = 1
+        elif abs(self.player_vy) <= 5:
+            jump_state = 2
+        else:
+            jump_state = 3
+        
+        over_pit = 0
+        center_x = self.player_x + PLAYER_SIZE/2
+        for i in level.between(level.pit_xs, level.pit_order, center_x - level.pit_reach, center_x):
+            obs = self.obstacles[i]
+            if center_x < obs['x'] + obs['width']:
+                over_pit = 1
+                break
+        
+        state = (obstacle_type, distance_bucket, jump_state, over_pit, nearest_coin_dist, nearest_coin_height)
+        return encode_state(state) if self.encode_states else state
+    
+    def step(self, action):
+        """Execute action and return (state, reward, done)"""
+        self.steps += 1
+        self.time_taken = self.steps / FPS
+        old_x = self.player_x
+        
+        # Actions: 0=nothing, 1=left, 2=right, 3=jump, 4=right+jump, 5=left+jump
+        if action == 1:
+            self.player_x -= PLAYER_SPEED
+        elif action == 2:
+            self.player_x += PLAYER_SPEED
+        elif action == 3:
+            if not self.is_jumping:
+                self.player_vy = JUMP_FORCE
+                self.is_jumping = True
+        elif action == 4:
+            self.player_x += PLAYER_SPEED
+            if not self.is_jumping:
+                self.player_vy = JUMP_FORCE
+                self.is_jumping = True
+        elif action == 5:
+            self.player_x -= PLAYER_SPEED
+            if not self.is_jumping:
+                self.player_vy = JUMP_FORCE
+                self.is_jumping = True
+        
+        # Apply gravity
+        self.player_vy += GRAVITY
+        self.player_y += self.player_vy
+        
+        # Ground collision
+        if self.player_y >= GROUND_Y - PLAYER_SIZE:
+            self.player_y = GROUND_Y - PLAYER_SIZE
+            self.player_vy = 0
+            self.is_jumping = False
+        
+        if self.player_x < 0:
+            self.player_x = 0
+        
+        # Update camera
+        self.camera_x = max(0, self.player_x - SCREEN_WIDTH // 3)
+        
+        reward = 0
+        done = False
+        
+        # Check coin collection (only coins within pickup reach)
+        center_x = self.player_x + PLAYER_SIZE/2
+        pickup_reach = PLAYER_SIZE/2 + COIN_RADIUS
+        level = self.level
+        for i in level.between(level.coin_xs, level.coin_order, center_x - pickup_reach, center_x + pickup_reach):
+            if not self.coin_collected[i]:
+                coin_dist = ((self.player_x + PLAYER_SIZE/2 - level.coin_x[i])**2 + 
+                           (self.player_y + PLAYER_SIZE/2 - level.coin_y[i])**2)**0.5
+                if coin_dist < PLAYER_SIZE/2 + COIN_RADIUS:
+                    self.coin_collected[i] = 1
+                    self.coins_collected += 1
+                    self.score += COIN_VALUE
+                    reward += COIN_COLLECT_REWARD
+        
+        # Reward for forward progress
+        if self.player_x > self.max_x:
+            reward += (self.player_x - self.max_x) * 0.3
+            self.max_x = self.player_x
+        
+        # Check collisions with obstacles (only those within reach)
+        nearby = level.between(level.obs_xs, level.obs_order,
+                               self.player_x - level.obs_reach,
+                               self.player_x + PLAYER_SIZE + level.obs_reach)
+        for i in nearby:
+            obs = self.obstacles[i]
+            if obs['type'] == 'pit':
+                if (self.player_x + PLAYER_SIZE > obs['x'] and 
+                    self.player_x < obs['x'] + obs['width']):
+                    if self.player_y + PLAYER_SIZE >= GROUND_Y - 2:
+                        self.game_over = True
+                        reward = -100
+                        done = True
+                    elif self.player_y < GROUND_Y - PLAYER_SIZE - 10:
+                        reward += 1
+                        
+            elif obs['type'] == 'block':
+                if (self.player_x + PLAYER_SIZE > obs['x'] + 5 and 
+                    self.player_x < obs['x'] + obs['width'] - 5 and
+                    self.player_y + PLAYER_SIZE > obs['y'] + 5):
+                    self.game_over = True
+                    reward = -50
+                    done = True
+                    
+            elif obs['type'] == 'spike':
+                if (self.player_x + PLAYER_SIZE > obs['x'] and 
+                    self.player_x < obs['x'] + obs['width'] and
+                    self.player_y + PLAYER_SIZE > obs['y']):
+                    self.game_over = True
+                    reward = -60
+                    done = True
+                    
+            elif obs['type'] == 'enemy':
+                enemy_x = obs['x']
+                enemy_y = obs['y']
+                dist = ((self.player_x + PLAYER_SIZE/2 - enemy_x)**2 + 
+                       (self.player_y + PLAYER_SIZE/2 - enemy_y)**2)**0.5
+                if dist < PLAYER_SIZE/2 + obs['radius']:
+                    self.game_over = True
+                    reward = -50
+                    done = True
+        
+        # Win condition
+        if self.player_x >= self.goal_x:
+            self.win = True
+            # Calculate final score with bonuses
+            coin_bonus = self.coins_collected * 5
+            time_bonus = max(0, 500 - self.steps) * 0.1
+            completion_bonus = 200
+            
+            # Perfect bonus
+            coin_percentage = (self.coins_collected / self.total_coins) * 100
+            if coin_percentage == 100:
+                perfect_bonus = 100
+            else:
+                perfect_bonus = 0
+            
+            reward = completion_bonus + coin_bonus + time_bonus + perfect_bonus
+            done = True
+            
+            # Update records
+            if self.time_taken < self.best_time:
+                self.best_time = self.time_taken
+            if self.score > self.best_score:
+                self.best_score = self.score
+        
+        # Small step penalty
+        reward -= 0.02
+        
+        # Penalty for going backwards
+        if self.player_x < old_x:
+            reward -= 0.2
+        
+        # Timeout penalty
+        if self.steps > self.level.max_steps:
+            done = True
+            reward = -30
+        
+        return self._get_state(), reward, done
@@ -0,0 +1,244 @@
+from collections import OrderedDict
+import pygame
+from mario_config import *
+
+
+def draw_coin(surface, x, y):
+    """Draw a coin with shine effect"""
+    pygame.draw.circle(surface, COIN_COLOR, (int(x), int(y)), COIN_RADIUS)
+    pygame.draw.circle(surface, (255, 240, 100), (int(x), int(y)), COIN_RADIUS - 3)
+    pygame.draw.circle(surface, COIN_COLOR, (int(x), int(y)), 3)
+    pygame.draw.circle(surface, (255, 255, 200), (int(x - 3), int(y - 3)), 2)
+
+
+def draw_cloud(surface, x, y):
+    pygame.draw.circle(surface, (255, 255, 255), (int(x), int(y)), 20)
+    pygame.draw.circle(surface, (255, 255, 255), (int(x + 25), int(y)), 25)
+    pygame.draw.circle(surface, (255, 255, 255), (int(x + 50), int(y)), 20)
+
+
+def draw_brick_block(surface, x, y, width, height):
+    pygame.draw.rect(surface, BLOCK_COLOR, (x, y, width, height))
+    pygame.draw.rect(surface, BLOCK_SHADOW, (x, y + height - 5, width, 5))
+    for i in range(0, height, 10):
+        pygame.draw.line(surface, BLOCK_SHADOW, (x, y + i), (x + width, y + i), 1)
+    pygame.draw.line(surface, BLOCK_SHADOW, (x + width//2, y), (x + width//2, y + height), 1)
+
+
+def draw_spike(surface, x, y, width, height):
+    num_spikes = max(1, width // 20)
+    spike_width = width // num_spikes
+    for i in range(num_spikes):
+        spike_x = x + i * spike_width
+        points = [
+            (spike_x, y + height),
+            (spike_x + spike_width // 2, y),
+            (spike_x + spike_width, y + height)
+        ]
+        pygame.draw.polygon(surface, SPIKE_COLOR, points)
+        pygame.draw.polygon(surface, SPIKE_OUTLINE, points, 2)
+
+
+def draw_enemy(surface, x, y, radius):
+    pygame.draw.circle(surface, ENEMY_COLOR, (int(x), int(y)), radius)
+    eye_offset = radius // 3
+    pygame.draw.circle(surface, (255, 255, 255),
+                      (int(x - eye_offset), int(y - eye_offset)), radius // 4)
+    pygame.draw.circle(surface, (255, 255, 255),
+                      (int(x + eye_offset), int(y - eye_offset)), radius // 4)
+    pygame.draw.circle(surface, (0, 0, 0),
+                      (int(x - eye_offset), int(y - eye_offset)), radius // 6)
+    pygame.draw.circle(surface, (0, 0, 0),
+                      (int(x + eye_offset), int(y - eye_offset)), radius // 6)
+
+
+def draw_player(surface, x, y):
+    pygame.draw.rect(surface, PLAYER_COLOR, (x, y, PLAYER_SIZE, PLAYER_SIZE))
+    pygame.draw.rect(surface, (200, 0, 0), (x, y, PLAYER_SIZE, 8))
+    pygame.draw.rect(surface, (255, 200, 150), (x + 5, y + 8, PLAYER_SIZE - 10, 15))
+    pygame.draw.circle(surface, (0, 0, 0), (int(x + 10), int(y + 15)), 2)
+    pygame.draw.circle(surface, (0, 0, 0), (int(x + 20), int(y + 15)), 2)
+    pygame.draw.rect(surface, (200, 0, 0), (x, y, PLAYER_SIZE, PLAYER_SIZE), 2)
+
+
+def draw_flag(surface, x, y):
+    pygame.draw.rect(surface, (100, 50, 0), (x + 5, y, 4, 80))
+    points = [(x + 9, y), (x + 45, y + 15), (x + 9, y + 30)]
+    pygame.draw.polygon(surface, GOAL_COLOR, points)
+    pygame.draw.polygon(surface, (200, 150, 0), points, 2)
+
+
+# Sprite layouts: kind -> (surface size, offset from the draw position, local draw call)
+# Sizes leave room for outlines; offsets put the draw origin where the primitives expect it.
+_SPRITES = {
+    'coin': lambda: ((2 * COIN_RADIUS + 1, 2 * COIN_RADIUS + 1), (-COIN_RADIUS, -COIN_RADIUS),
+                     lambda s: draw_coin(s, COIN_RADIUS, COIN_RADIUS)),
+    'cloud': lambda: ((91, 51), (-20, -25), lambda s: draw_cloud(s, 20, 25)),
+    'block': lambda w, h: ((w + 1, h + 1), (0, 0), lambda s: draw_brick_block(s, 0, 0, w, h)),
+    'spike': lambda w, h: ((w + 5, h + 5), (-2, -2), lambda s: draw_spike(s, 2, 2, w, h)),
+    'enemy': lambda r: ((2 * r + 1, 2 * r + 1), (-r, -r), lambda s: draw_enemy(s, r, r, r)),
+    'player': lambda: ((PLAYER_SIZE, PLAYER_SIZE), (0, 0), lambda s: draw_player(s, 0, 0)),
+    'flag': lambda: ((50, 84), (-2, -2), lambda s: draw_flag(s, 2, 2)),
+}
+
+
+class SpriteCache:
+    """Pre-rasterized sprites, fonts and text surfaces so frames are mostly blits"""
+
+    def __init__(self, max_texts=128):
+        self._sprites = {}
+        self._fonts = {}
+        self._texts = OrderedDict()
+        self._max_texts = max_texts
+
+    def _prepare(self, surface):
+        # Match the display's pixel format when there is one, for faster blits
+        if pygame.display.get_init() and pygame.display.get_surface() is not None:
+            return surface.convert_alpha()
+        return surface
+
+    def sprite(self, kind, *size):
+        """(surface, offset) for a sprite kind at the given size, rasterized on first use"""
+        key = (kind,) + size
+        cached = self._sprites.get(key)
+        if cached is None:
+            dims, offset, draw = _SPRITES[kind](*size)
+            surface = pygame.Surface(dims, pygame.SRCALPHA)
+            draw(surface)
+            cached = (self._prepare(surface), offset)
+            self._sprites[key] = cached
+        return cached
+
+    def blit(self, target, kind, x, y, *size):
+        """Draw a cached sprite where the matching draw_* function would have drawn it"""
+        surface, (dx, dy) = self.sprite(kind, *size)
+        target.blit(surface, (int(x) + dx, int(y) + dy))
+
+    def font(self, size):
+        font = self._fonts.get(size)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = pygame.font.Font(None, size)
+            self._fonts[size] = font
+        return font
+
+    def text(self, text, size, color):
+        """(text, shadow) surfaces for a string; re-rendered only when the string changes"""
+        key = (text, size, color)
+        cached = self._texts.get(key)
+        if cached is not None:
+            self._texts.move_to_end(key)
+            return cached
+
+        font = self.font(size)
+        cached = (font.render(text, True, color), font.render(text, True, (0, 0, 0)))
+        self._texts[key] = cached
+        if len(self._texts) > self._max_texts:
+            self._texts.popitem(last=False)
+        return cached
+
+    def blit_text(self, target, text, size, color, pos, shadow_offset=(2, 2), center=False):
+        """Draw text with a black drop shadow, its top-left (or center) at pos"""
+        front, shadow = self.text(text, size, color)
+        x, y = pos
+        if center:
+            x -= front.get_width() // 2
+            y -= front.get_height() // 2
+        target.blit(shadow, (x + shadow_offset[0], y + shadow_offset[1]))
+        target.blit(front, (x, y))
+
+
+# Never drawn by any sprite, so it marks the see-through (sky) part of background tiles
+_COLORKEY = (255, 0, 255)
+_TILE_MARGIN = 16  # Extra pixels drawn on each side of a tile before cropping
+
+
+class LevelBackground:
+    """Static level scenery (ground, pits, blocks, spikes, flag) pre-drawn into fixed-width tiles
+
+    Tiles are drawn the first time they scroll into view and kept while they
+    are among the last few screen-widths shown (BACKGROUND_CACHE_SCREENS), so a
+    frame costs a couple of blits and memory stays flat however long the level is.
+    Only the band from the highest static object down to the bottom of the
+    screen is stored; the sky stays transparent so the clouds show through.
+    """
+
+    def __init__(self, level, sprites, ground_color=GROUND_COLOR, chunk_width=BACKGROUND_CHUNK_WIDTH):
+        self.level = level
+        self.sprites = sprites
+        self.ground_color = ground_color
+        self.chunk_width = chunk_width
+        self._chunks = OrderedDict()
+        self.max_chunks = (-(-SCREEN_WIDTH // chunk_width) + 1) * BACKGROUND_CACHE_SCREENS
+
+        top = GROUND_Y - 100  # goal zone
+        for obs in level.obstacles:
+            if obs['type'] in ('block', 'spike'):
+                top = min(top, obs['y'] - 2)
+        self.top = max(0, top)
+
+    def _build(self, index):
+        level = self.level
+        sprites = self.sprites
+        # Drawn with a margin and cropped, so thick lines crossing a tile edge
+        # aren't clipped there (clipping shifts the pixels pygame rasterizes)
+        width = self.chunk_width + 2 * _TILE_MARGIN
+        x0 = index * self.chunk_width - _TILE_MARGIN
+        top = self.top
+        ground_y = GROUND_Y - top
+        height = SCREEN_HEIGHT - top
+
+        surface = pygame.Surface((width, height))
+        surface.fill(_COLORKEY)
+
+        # Ground and grass
+        pygame.draw.rect(surface, self.ground_color, (0, ground_y, width, SCREEN_HEIGHT - GROUND_Y))
+        for grass_x in range(x0 - x0 % 20 - 20, x0 + width + 20, 20):
+            pygame.draw.line(surface, (50, 150, 50),
+                           (grass_x - x0, ground_y), (grass_x - x0, ground_y - 8), 2)
+
+        # Obstacles overlapping this tile; enemies are drawn per frame
+        for i in level.between(level.obs_xs, level.obs_order, x0 - level.obs_reach - 10, x0 + width + 10):
+            obs = level.obstacles[i]
+            screen_x = obs['x'] - x0
+
+            if obs['type'] == 'pit':
+                pygame.draw.rect(surface, PIT_COLOR, (screen_x, ground_y, obs['width'], SCREEN_HEIGHT - GROUND_Y))
+                for j in range(0, obs['width'], 10):
+                    pygame.draw.line(surface, (50, 50, 50),
+                                   (screen_x + j, ground_y),
+                                   (screen_x + j + 5, ground_y + 10), 2)
+
+            elif obs['type'] == 'block':
+                sprites.blit(surface, 'block', screen_x, obs['y'] - top, obs['width'], obs['height'])
+
+            elif obs['type'] == 'spike':
+                sprites.blit(surface, 'spike', screen_x, obs['y'] - top, obs['width'], obs['height'])
+
+        # Goal flag and goal zone indicator
+        goal_x = level.goal_x - x0
+        if -100 < goal_x < width + 100:
+            sprites.blit(surface, 'flag', goal_x, ground_y - 80)
+            pygame.draw.rect(surface, (255, 215, 0), (goal_x - 30, ground_y - 100, 60, 100), 3)
+
+        surface = surface.subsurface((_TILE_MARGIN, 0, self.chunk_width, height)).copy()
+        if pygame.display.get_init() and pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        surface.set_colorkey(_COLORKEY, pygame.RLEACCEL)
+        return surface
+
+    def draw(self, target, camera_x):
+        """Blit the tiles covering the screen at camera_x"""
+        camera_x = int(camera_x)
+        width = self.chunk_width
+        chunks = self._chunks
+        for index in range(camera_x // width, (camera_x + SCREEN_WIDTH - 1) // width + 1):
+            chunk = chunks.get(index)
+            if chunk is None:
+                chunk = chunks[index] = self._build(index)
+                if len(chunks) > self.max_chunks:
+                    chunks.popitem(last=False)
+            else:
+                chunks.move_to_end(index)
+            target.blit(chunk, (index * width - camera_x, self.top))
@@ -0,0 +1,28 @@
+from itertools import product
+from mario_config import *
+
+# Mixed-radix encoding of the _get_state tuple into a dense integer index
+STATE_RADICES = tuple(len(values) for values in STATE_SPACE.values())
+STATE_DIGITS = tuple({value: digit for digit, value in enumerate(values)} for values in STATE_SPACE.values())
+
+NUM_STATES = 1
+for _radix in STATE_RADICES:
+    NUM_STATES *= _radix
+
+# Every valid state tuple, indexed by its encoding
+STATE_TUPLES = tuple(product(*STATE_SPACE.values()))
+
+
+def encode_state(state):
+    """Dense index (0 .. NUM_STATES-1) of a state tuple; raises KeyError/ValueError if it is not in STATE_SPACE"""
+    if len(state) != len(STATE_RADICES):
+        raise ValueError(f"Expected a {len(STATE_RADICES)}-component state, got {state}")
+    index = 0
+    for digits, radix, value in zip(STATE_DIGITS, STATE_RADICES, state):
+        index = index * radix + digits[value]
+    return index
+
+
+def decode_state(index):
+    """State tuple for a dense index"""
+    return STATE_TUPLES[index]
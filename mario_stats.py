@@ -0,0 +1,196 @@
+import json
+import os
+import numpy as np
+from mario_config import *
+from mario_metrics import RollingMetrics
+
+# One fixed-width little-endian record per episode in the streamed stats file
+STATS_DTYPE = np.dtype([
+    ('episode', '<u4'),
+    ('reward', '<f8'),
+    ('steps', '<u4'),
+    ('score', '<i4'),
+    ('time', '<f8'),
+    ('coins', '<u4'),
+    ('total_coins', '<u4'),
+    ('coin_pct', '<f8'),
+    ('win', 'u1'),
+    ('perfect', 'u1'),
+    ('epsilon', '<f8'),
+    ('win_rate', '<f8'),
+])
+
+STATS_MAGIC = b'MARIOST\0'
+_HEADER_ALIGN = 64
+
+# stop_reason of a run cut short with Ctrl+C (callers save what was learned, then stop)
+INTERRUPTED = "interrupted"
+
+
+class StatsWriter:
+    """Append-only columnar stats file: a small header, then STATS_DTYPE records flushed every N episodes"""
+
+    def __init__(self, filename, flush_every=STATS_FLUSH_EVERY):
+        self.filename = filename
+        self._buffer = np.zeros(flush_every, dtype=STATS_DTYPE)
+        self._pending = 0
+        self._file = open(filename, 'wb')
+
+        descr = json.dumps(STATS_DTYPE.descr).encode('utf-8')
+        header_len = -(-(len(STATS_MAGIC) + 4 + len(descr)) // _HEADER_ALIGN) * _HEADER_ALIGN
+        self._file.write(STATS_MAGIC)
+        self._file.write(header_len.to_bytes(4, 'little'))
+        self._file.write(descr.ljust(header_len - len(STATS_MAGIC) - 4, b' '))
+        self._file.flush()
+
+    def write(self, record):
+        """Buffer one episode record (a dict with the STATS_DTYPE field names)"""
+        row = self._buffer[self._pending]
+        for name in STATS_DTYPE.names:
+            row[name] = record[name]
+        self._pending += 1
+        if self._pending == len(self._buffer):
+            self.flush()
+
+    def flush(self):
+        """Write buffered records to disk"""
+        if self._pending:
+            self._file.write(self._buffer[:self._pending].tobytes())
+            self._pending = 0
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_stats(filename):
+    """Load a streamed stats file as a dict of NumPy column arrays (a partly written last record is ignored)"""
+    with open(filename, 'rb') as f:
+        if f.read(len(STATS_MAGIC)) != STATS_MAGIC:
+            raise ValueError(f"{filename}: not a training stats file")
+        header_len = int.from_bytes(f.read(4), 'little')
+        dtype = np.dtype([tuple(field) for field in json.loads(f.read(header_len - len(STATS_MAGIC) - 4))])
+
+    count = (os.path.getsize(filename) - header_len) // dtype.itemsize
+    if count == 0:
+        return {name: np.zeros(0, dtype=dtype[name]) for name in dtype.names}
+    records = np.memmap(filename, dtype=dtype, mode='r', offset=header_len, shape=(count,))
+    return {name: np.array(records[name]) for name in dtype.names}
+
+
+class TrainingStats:
+    """Per-episode training statistics with the progress table and final summary printed by train()
+
+    Windowed values come from RollingMetrics, so bookkeeping is constant-time
+    and constant-memory; full per-episode records go to an optional StatsWriter.
+    """
+
+    def __init__(self, writer=None):
+        self.writer = writer
+        self.metrics = RollingMetrics()
+        self.wins = 0
+        self.perfect_runs = 0
+        self.episodes = 0
+        self.total_coins = 0
+        self.stop_reason = None
+
+    def print_header(self):
+        print(f"{'Episode':<10}{'Result':<8}{'Time':<10}{'Score':<10}{'Coins':<15}{'Epsilon':<12}{'Win Rate':<12}")
+        print("-" * 90)
+
+    def record(self, result):
+        """Add one episode result (see QLearningAgent.run_episode) and print progress every PRINT_PROGRESS_EVERY episodes"""
+        metrics = self.metrics
+        episode = self.episodes
+        self.episodes += 1
+        self.total_coins = result['total_coins']
+
+        perfect = result['win'] and result['coins'] == result['total_coins']
+        if result['win']:
+            self.wins += 1
+            if perfect:
+                self.perfect_runs += 1
+
+        coin_pct = (result['coins'] / result['total_coins'] * 100) if result['total_coins'] > 0 else 0
+        metrics.add(result['win'], result['score'], result['coins'], coin_pct, result['time'])
+        win_rate = metrics.win_rate()
+
+        if self.writer is not None:
+            self.writer.write({
+                'episode': episode,
+                'reward': result['reward'],
+                'steps': result['steps'],
+                'score': result['score'],
+                'time': result['time'],
+                'coins': result['coins'],
+                'total_coins': result['total_coins'],
+                'coin_pct': coin_pct,
+                'win': result['win'],
+                'perfect': perfect,
+                'epsilon': result['epsilon'],
+                'win_rate': win_rate,
+            })
+
+        # Print progress
+        if (episode + 1) % PRINT_PROGRESS_EVERY == 0:
+            avg_time = metrics.progress_mean('time')
+            avg_score = metrics.progress_mean('score')
+            avg_coins = metrics.progress_mean('coins')
+            avg_coin_pct = metrics.progress_mean('coin_pct')
+
+            wins_str = f"{self.wins}/{episode+1}"
+            coin_str = f"{avg_coins:.1f}/{result['total_coins']} ({avg_coin_pct:.0f}%)"
+
+            print(f"{episode+1:<10}{wins_str:<8}{avg_time:<10.1f}{int(avg_score):<10}{coin_str:<15}{result['epsilon']:<12.4f}{win_rate:<12.2%}")
+
+    def stop(self, reason):
+        """Note that training is ending early, and why"""
+        self.stop_reason = reason if isinstance(reason, str) else "stop condition met"
+        print(f"\n Stopping early after {self.episodes} episodes: {self.stop_reason}")
+
+    def finish(self, q_table_size, epsilon):
+        """Compute the last-WIN_RATE_WINDOW-episode summary, print it and return it as a dict"""
+        if self.writer is not None:
+            self.writer.flush()
+
+        metrics = self.metrics
+        final_win_rate = metrics.win_rate()
+        avg_final_score = metrics.mean('score')
+        avg_final_coins = metrics.mean('coins')
+        avg_final_coin_pct = metrics.mean('coin_pct')
+        avg_final_time = metrics.mean('time')
+
+        stats = {
+            'final_win_rate': final_win_rate,
+            'avg_final_score': avg_final_score,
+            'avg_final_coins': avg_final_coins,
+            'avg_final_coin_pct': avg_final_coin_pct,
+            'avg_final_time': avg_final_time,
+            'perfect_runs': self.perfect_runs,
+            'total_episodes': self.episodes,
+            'q_table_size': q_table_size,
+            'stop_reason': self.stop_reason
+        }
+
+        print("\n" + "="*90)
+        print(" TRAINING COMPLETE!")
+        print("="*90)
+        print(f"Performance (last {len(metrics.window['win'])} episodes):")
+        print(f"   • Win Rate: {final_win_rate:.2%}")
+        print(f"   • Avg Score: {int(avg_final_score)}")
+        print(f"   • Avg Coins: {avg_final_coins:.1f}/{self.total_coins} ({avg_final_coin_pct:.1f}%)")
+        print(f"   • Avg Time: {avg_final_time:.1f}s")
+        print(f"   • Perfect Runs: {self.perfect_runs}")
+        print(f"\n Q-table size: {q_table_size} states")
+        print(f" Final epsilon: {epsilon:.4f}")
+        print("="*90)
+
+        return stats
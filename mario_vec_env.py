@@ -0,0 +1,330 @@
+import numpy as np
+from mario_config import *
+from mario_level import get_level, OBSTACLE_CODES
+from mario_state import STATE_DIGITS, STATE_RADICES
+
+# Obstacle type codes (same numbering as the state's obstacle_type)
+OBS_NONE = 0
+OBS_PIT = OBSTACLE_CODES['pit']
+OBS_BLOCK = OBSTACLE_CODES['block']
+OBS_SPIKE = OBSTACLE_CODES['spike']
+OBS_ENEMY = OBSTACLE_CODES['enemy']
+
+# Death reward per obstacle type, matching MarioSim.step
+DEATH_REWARDS = np.array([0.0, -100.0, -50.0, -60.0, -50.0])
+
+# Per-component raw value -> digit lookup tables and place values for encode_state_batch
+_DIGIT_TABLES = []
+for _digits in STATE_DIGITS:
+    _table = np.zeros(max(_digits) + 1, dtype=np.int64)
+    _table[list(_digits)] = list(_digits.values())
+    _DIGIT_TABLES.append(_table)
+_PLACE_VALUES = np.cumprod((STATE_RADICES[1:] + (1,))[::-1])[::-1]
+
+
+def encode_state_batch(states):
+    """Vectorized encode_state for an (N, 6) array of state tuples"""
+    index = np.zeros(len(states), dtype=np.int64)
+    for k, (table, place) in enumerate(zip(_DIGIT_TABLES, _PLACE_VALUES)):
+        index += table[states[:, k]] * place
+    return index
+
+
+class VectorMarioEnv:
+    """N Mario episodes stepped together with NumPy arrays (same rules as MarioSim.step)"""
+
+    def __init__(self, num_envs, level_id=CLASSIC_LEVEL, level_seed=None, encode_states=False, seed=None,
+                 num_patterns=None):
+        self.num_envs = num_envs
+        self.num_patterns = num_patterns
+        self.rng = np.random.default_rng(seed)
+        self.encode_states = encode_states
+        self.level_id = level_id
+        self.level_seed = level_seed
+
+        n = num_envs
+        self.player_x = np.zeros(n)
+        self.player_y = np.zeros(n)
+        self.player_vy = np.zeros(n)
+        self.is_jumping = np.zeros(n, dtype=bool)
+        self.game_over = np.zeros(n, dtype=bool)
+        self.win = np.zeros(n, dtype=bool)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.coins_collected = np.zeros(n, dtype=np.int64)
+        self.total_coins = np.zeros(n, dtype=np.int64)
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.max_x = np.zeros(n)
+        self.goal_x = np.zeros(n)
+        self.layout_seed = np.zeros(n, dtype=np.int64)
+        self.max_steps = np.full(n, MAX_STEPS, dtype=np.int64)
+
+        # Level geometry, one row per env padded with inert entries at x=inf
+        self.obs_type = np.zeros((n, 1), dtype=np.int8)
+        self.obs_x = np.full((n, 1), np.inf)
+        self.obs_y = np.zeros((n, 1))
+        self.obs_w = np.zeros((n, 1))
+        self.obs_h = np.zeros((n, 1))
+        self.obs_r = np.zeros((n, 1))
+        self.coin_x = np.full((n, 1), np.inf)
+        self.coin_y = np.zeros((n, 1))
+        self.coin_collected = np.ones((n, 1), dtype=bool)
+
+        # Results of the episodes that ended on the last step (valid where done)
+        self.final_info = {
+            'win': np.zeros(n, dtype=bool),
+            'score': np.zeros(n, dtype=np.int64),
+            'coins_collected': np.zeros(n, dtype=np.int64),
+            'total_coins': np.zeros(n, dtype=np.int64),
+            'steps': np.zeros(n, dtype=np.int64),
+        }
+
+        self._rows = np.arange(n)
+        self.reset()
+
+    @property
+    def time_taken(self):
+        return self.steps / FPS
+
+    def reset(self, seed=None):
+        """Reset every env and return the batched states (a seed re-seeds the env's generator)"""
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self.reset_envs(self._rows)
+        return self._get_states()
+
+    def reset_envs(self, env_ids):
+        """Reset the given envs, each on a cached level layout"""
+        if self.level_seed is not None:
+            seeds = [self.level_seed] * len(env_ids)
+        else:
+            seeds = self.rng.integers(LEVEL_SEED_POOL, size=len(env_ids)).tolist()
+        for i, seed in zip(env_ids, seeds):
+            self.load_level(i, get_level(self.level_id, seed, quiet=True, num_patterns=self.num_patterns))
+        self.layout_seed[env_ids] = seeds
+
+        self.player_x[env_ids] = 100
+        self.player_y[env_ids] = GROUND_Y - PLAYER_SIZE
+        self.player_vy[env_ids] = 0
+        self.is_jumping[env_ids] = False
+        self.game_over[env_ids] = False
+        self.win[env_ids] = False
+        self.score[env_ids] = 0
+        self.coins_collected[env_ids] = 0
+        self.steps[env_ids] = 0
+        self.max_x[env_ids] = 100
+
+    def restore_snapshot(self, env_ids, snapshot):
+        """Put the given envs into the state of a MarioSim snapshot (e.g. to run many rollouts from it)"""
+        env_ids = np.atleast_1d(env_ids)
+        level = snapshot.level
+        for i in env_ids:
+            self.load_level(i, level)
+        self.layout_seed[env_ids] = snapshot.layout_seed
+
+        self.player_x[env_ids] = snapshot.player_x
+        self.player_y[env_ids] = snapshot.player_y
+        self.player_vy[env_ids] = snapshot.player_vy
+        self.is_jumping[env_ids] = snapshot.is_jumping
+        self.game_over[env_ids] = snapshot.game_over
+        self.win[env_ids] = snapshot.win
+        self.score[env_ids] = snapshot.score
+        self.coins_collected[env_ids] = snapshot.coins_collected
+        self.steps[env_ids] = snapshot.steps
+        self.max_x[env_ids] = snapshot.max_x
+        self.coin_collected[env_ids, :level.num_coins] = np.frombuffer(snapshot.coin_collected, dtype=np.uint8) != 0
+        return self._get_states()
+
+    def load_level(self, i, level):
+        """Write a compiled Level into env row i"""
+        obs_type, obs_x, obs_y, obs_w, obs_h, obs_r, coin_x, coin_y = level.arrays
+        num_obs = len(obs_x)
+        num_coins = len(coin_x)
+        self._ensure_capacity(num_obs, num_coins)
+
+        self.obs_type[i] = OBS_NONE
+        self.obs_x[i] = np.inf
+        self.obs_type[i, :num_obs] = obs_type
+        self.obs_x[i, :num_obs] = obs_x
+        self.obs_y[i, :num_obs] = obs_y
+        self.obs_w[i, :num_obs] = obs_w
+        self.obs_h[i, :num_obs] = obs_h
+        self.obs_r[i, :num_obs] = obs_r
+
+        self.coin_x[i] = np.inf
+        self.coin_x[i, :num_coins] = coin_x
+        self.coin_y[i, :num_coins] = coin_y
+        self.coin_collected[i] = True
+        self.coin_collected[i, :num_coins] = False
+
+        self.total_coins[i] = num_coins
+        self.goal_x[i] = level.goal_x
+        self.max_steps[i] = level.max_steps
+
+    def _ensure_capacity(self, num_obstacles, num_coins):
+        """Grow the padded geometry arrays when a level has more entities than fit"""
+        extra = num_obstacles - self.obs_x.shape[1]
+        if extra > 0:
+            pad = ((0, 0), (0, extra))
+            self.obs_type = np.pad(self.obs_type, pad, constant_values=OBS_NONE)
+            self.obs_x = np.pad(self.obs_x, pad, constant_values=np.inf)
+            self.obs_y = np.pad(self.obs_y, pad)
+            self.obs_w = np.pad(self.obs_w, pad)
+            self.obs_h = np.pad(self.obs_h, pad)
+            self.obs_r = np.pad(self.obs_r, pad)
+
+        extra = num_coins - self.coin_x.shape[1]
+        if extra > 0:
+            pad = ((0, 0), (0, extra))
+            self.coin_x = np.pad(self.coin_x, pad, constant_values=np.inf)
+            self.coin_y = np.pad(self.coin_y, pad)
+            self.coin_collected = np.pad(self.coin_collected, pad, constant_values=True)
+
+    def _get_states(self):
+        """Batched version of MarioSim._get_state: an (N, 6) int array, or (N,) state indices when encoding"""
+        px = self.player_x[:, None]
+        states = np.empty((self.num_envs, 6), dtype=np.int64)
+
+        # Nearest obstacle ahead (first one wins on ties, like the scalar loop)
+        dist = self.obs_x - px
+        ahead = (self.obs_type != OBS_NONE) & (dist > -20)
+        dist = np.where(ahead, dist, np.inf)
+        nearest = dist.argmin(axis=1)
+        min_dist = dist[self._rows, nearest]
+        has_obstacle = np.isfinite(min_dist)
+
+        states[:, 0] = np.where(has_obstacle, self.obs_type[self._rows, nearest], 0)
+        states[:, 1] = np.where(
+            has_obstacle,
+            np.searchsorted(np.array([30, 60, 100, 150, 200]), min_dist, side='right'),
+            8)
+
+        # Jump state
+        vy = self.player_vy
+        states[:, 2] = np.where(~self.is_jumping, 0,
+                                np.where(vy < -5, 1, np.where(np.abs(vy) <= 5, 2, 3)))
+
+        # Over a pit
+        center = px + PLAYER_SIZE / 2
+        over_pit = ((self.obs_type == OBS_PIT) & (center > self.obs_x) &
+                    (center < self.obs_x + self.obs_w))
+        states[:, 3] = over_pit.any(axis=1)
+
+        # First uncollected coin (in level order) within the look-ahead window
+        coin_dist = self.coin_x - px
+        visible = ~self.coin_collected & (coin_dist > -10) & (coin_dist < 200)
+        has_coin = visible.any(axis=1)
+        first = visible.argmax(axis=1)
+        first_dist = coin_dist[self._rows, first]
+        first_y = self.coin_y[self._rows, first]
+        coin_bucket = np.where(first_dist < 50, 0,
+                               np.where(first_dist < 100, 1, np.where(first_dist < 150, 2, 8)))
+        coin_height = np.where(first_y < GROUND_Y - 100, 2, np.where(first_y < GROUND_Y - 60, 1, 0))
+        states[:, 4] = np.where(has_coin, coin_bucket, 8)
+        states[:, 5] = np.where(has_coin, coin_height, 0)
+
+        return encode_state_batch(states) if self.encode_states else states
+
+    def step(self, actions):
+        """Advance every env by one action; returns (states, rewards, dones) and auto-resets finished envs"""
+        actions = np.asarray(actions)
+        self.steps += 1
+        old_x = self.player_x.copy()
+
+        # Actions: 0=nothing, 1=left, 2=right, 3=jump, 4=right+jump, 5=left+jump
+        move_left = (actions == 1) | (actions == 5)
+        move_right = (actions == 2) | (actions == 4)
+        self.player_x += np.where(move_right, PLAYER_SPEED, 0) - np.where(move_left, PLAYER_SPEED, 0)
+
+        jump = (actions >= 3) & ~self.is_jumping
+        self.player_vy[jump] = JUMP_FORCE
+        self.is_jumping |= jump
+
+        # Apply gravity
+        self.player_vy += GRAVITY
+        self.player_y += self.player_vy
+
+        # Ground collision
+        landed = self.player_y >= GROUND_Y - PLAYER_SIZE
+        self.player_y[landed] = GROUND_Y - PLAYER_SIZE
+        self.player_vy[landed] = 0
+        self.is_jumping[landed] = False
+
+        np.maximum(self.player_x, 0, out=self.player_x)
+
+        px = self.player_x[:, None]
+        py = self.player_y[:, None]
+        cx = px + PLAYER_SIZE / 2
+        cy = py + PLAYER_SIZE / 2
+
+        # Check coin collection
+        hit = ~self.coin_collected & (
+            np.hypot(cx - self.coin_x, cy - self.coin_y) < PLAYER_SIZE / 2 + COIN_RADIUS)
+        self.coin_collected |= hit
+        new_coins = hit.sum(axis=1)
+        self.coins_collected += new_coins
+        self.score += new_coins * COIN_VALUE
+        rewards = new_coins * float(COIN_COLLECT_REWARD)
+
+        # Reward for forward progress
+        forward = self.player_x > self.max_x
+        rewards += np.where(forward, (self.player_x - self.max_x) * 0.3, 0)
+        np.maximum(self.max_x, self.player_x, out=self.max_x)
+
+        # Check collisions with obstacles
+        t = self.obs_type
+        ox, oy, ow = self.obs_x, self.obs_y, self.obs_w
+        over_pit = (t == OBS_PIT) & (px + PLAYER_SIZE > ox) & (px < ox + ow)
+        pit_death = over_pit & (py + PLAYER_SIZE >= GROUND_Y - 2)
+        pit_bonus = over_pit & ~pit_death & (py < GROUND_Y - PLAYER_SIZE - 10)
+        block_death = ((t == OBS_BLOCK) & (px + PLAYER_SIZE > ox + 5) &
+                       (px < ox + ow - 5) & (py + PLAYER_SIZE > oy + 5))
+        spike_death = ((t == OBS_SPIKE) & (px + PLAYER_SIZE > ox) &
+                       (px < ox + ow) & (py + PLAYER_SIZE > oy))
+        enemy_death = ((t == OBS_ENEMY) &
+                       (np.hypot(cx - ox, cy - oy) < PLAYER_SIZE / 2 + self.obs_r))
+        death = pit_death | block_death | spike_death | enemy_death
+
+        # The scalar loop overwrites the reward with the last fatal obstacle in
+        # level order, then keeps adding pit bonuses from obstacles after it
+        died = death.any(axis=1)
+        num_obs = death.shape[1]
+        last_death = num_obs - 1 - death[:, ::-1].argmax(axis=1)
+        after_death = np.arange(num_obs) > last_death[:, None]
+        death_reward = DEATH_REWARDS[t[self._rows, last_death]]
+        rewards = np.where(died,
+                           death_reward + (pit_bonus & after_death).sum(axis=1),
+                           rewards + pit_bonus.sum(axis=1))
+        self.game_over |= died
+        dones = died.copy()
+
+        # Win condition
+        won = self.player_x >= self.goal_x
+        if won.any():
+            coin_bonus = self.coins_collected * 5
+            time_bonus = np.maximum(0, 500 - self.steps) * 0.1
+            perfect_bonus = np.where(self.coins_collected == self.total_coins, 100, 0)
+            rewards = np.where(won, 200 + coin_bonus + time_bonus + perfect_bonus, rewards)
+            self.win |= won
+            dones |= won
+
+        # Small step penalty
+        rewards -= 0.02
+
+        # Penalty for going backwards
+        rewards -= np.where(self.player_x < old_x, 0.2, 0)
+
+        # Timeout penalty
+        timeout = self.steps > self.max_steps
+        rewards[timeout] = -30
+        dones |= timeout
+
+        finished = np.flatnonzero(dones)
+        if len(finished):
+            self.final_info['win'][finished] = self.win[finished]
+            self.final_info['score'][finished] = self.score[finished]
+            self.final_info['coins_collected'][finished] = self.coins_collected[finished]
+            self.final_info['total_coins'][finished] = self.total_coins[finished]
+            self.final_info['steps'][finished] = self.steps[finished]
+            self.reset_envs(finished)
+
+        return self._get_states(), rewards, dones
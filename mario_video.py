@@ -0,0 +1,186 @@
+import argparse
+import os
+import sys
+import numpy as np
+import pygame
+from mario_config import *
+from mario_env import MarioGame
+from mario_replay import TrajectoryReader, TrajectoryRecorder, seek
+
+# Animated GIFs need Pillow; PNG strips, .y4m video and raw .npy frames don't
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+def frame_size(scale=1.0):
+    return max(1, int(SCREEN_WIDTH * scale)), max(1, int(SCREEN_HEIGHT * scale))
+
+
+def render_frames(trajectory, every=1, scale=1.0, max_frames=None, game=None):
+    """Re-simulate a trajectory off-screen into a preallocated uint8 array of shape (frames, height, width, 3)
+
+    Every `every`-th step is kept (plus the first and last frame), downscaled by `scale`.
+    """
+    game = game or MarioGame(headless=True, quiet=True)
+    kept = list(range(0, len(trajectory) + 1, every))
+    if kept[-1] != len(trajectory):
+        kept.append(len(trajectory))
+    if max_frames is not None:
+        kept = kept[:max_frames]
+
+    width, height = frame_size(scale)
+    frames = np.empty((len(kept), height, width, 3), dtype=np.uint8)
+    canvas = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), 0, 32)
+    small = canvas if (width, height) == (SCREEN_WIDTH, SCREEN_HEIGHT) else pygame.Surface((width, height), 0, 32)
+
+    seek(trajectory, 0, game)
+    step = 0
+    for i, target in enumerate(kept):
+        for action in trajectory.actions[step:target]:
+            game.step(action)
+        step = target
+        game.draw(canvas)
+        if small is not canvas:
+            pygame.transform.smoothscale(canvas, (width, height), small)
+        # pixels3d is a (width, height, 3) view of the surface, so no per-frame allocation
+        pixels = pygame.surfarray.pixels3d(small)
+        frames[i] = pixels.transpose(1, 0, 2)
+        del pixels
+    return frames
+
+
+def save_gif(frames, filename, fps):
+    images = [Image.fromarray(frame) for frame in frames]
+    images[0].save(filename, save_all=True, append_images=images[1:], duration=int(1000 / fps), loop=0)
+
+
+def save_png_strip(frames, filename, columns=8):
+    """Tile the frames left to right, top to bottom into one PNG"""
+    count, height, width, _ = frames.shape
+    columns = min(columns, count)
+    rows = -(-count // columns)
+    sheet = np.zeros((rows * height, columns * width, 3), dtype=np.uint8)
+    for i, frame in enumerate(frames):
+        row, col = divmod(i, columns)
+        sheet[row * height:(row + 1) * height, col * width:(col + 1) * width] = frame
+    pygame.image.save(pygame.surfarray.make_surface(sheet.transpose(1, 0, 2)), filename)
+
+
+def save_y4m(frames, filename, fps):
+    """Uncompressed YUV4MPEG2 (4:4:4) video, playable by ffmpeg/mpv and easy to transcode"""
+    count, height, width, _ = frames.shape
+    with open(filename, 'wb') as f:
+        f.write(f"YUV4MPEG2 W{width} H{height} F{int(round(fps))}:1 Ip A1:1 C444\n".encode('ascii'))
+        for frame in frames:
+            rgb = frame.astype(np.float32)
+            r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+            # BT.601 studio range
+            y = 16 + 0.257 * r + 0.504 * g + 0.098 * b
+            u = 128 - 0.148 * r - 0.291 * g + 0.439 * b
+            v = 128 + 0.439 * r - 0.368 * g - 0.071 * b
+            f.write(b"FRAME\n")
+            f.write(np.clip(np.stack([y, u, v]) + 0.5, 0, 255).astype(np.uint8).tobytes())
+
+
+def check_format(filename):
+    """Raise before any rendering if frames can't be saved under this file name"""
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in ('.gif', '.png', '.y4m', '.npy'):
+        raise ValueError(f"Unsupported video format: {ext} (use .gif, .png, .y4m or .npy)")
+    if ext == '.gif' and Image is None:
+        raise RuntimeError("Animated GIF export needs Pillow (pip install pillow); "
+                           "use a .png strip, .y4m or .npy output instead")
+
+
+def save_frames(frames, filename, fps):
+    """Write frames in the format given by the file extension (.gif, .png, .y4m or .npy)"""
+    check_format(filename)
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == '.gif':
+        save_gif(frames, filename, fps)
+    elif ext == '.png':
+        save_png_strip(frames, filename)
+    elif ext == '.y4m':
+        save_y4m(frames, filename, fps)
+    else:
+        np.save(filename, frames)
+
+
+def record_policy(agent, episodes=1, level_seed=None, level_id=CLASSIC_LEVEL, num_patterns=None):
+    """Play greedy episodes headless and return their trajectories (agent: QLearningAgent or FrozenPolicy)"""
+    from mario_sim import MarioSim
+    game = MarioSim(quiet=True, level_id=level_id, level_seed=level_seed, encode_states=True,
+                    num_patterns=num_patterns)
+    recorder = TrajectoryRecorder()
+    trajectories = []
+    for _ in range(episodes):
+        state = game.reset()
+        recorder.begin(game, state)
+        done = False
+        while not done:
+            action = agent.get_action(state, explore=False)
+            state, reward, done = game.step(action)
+            recorder.step(action, state, reward)
+        trajectories.append(recorder.end())
+    return trajectories
+
+
+def export_video(trajectories, output, every=2, scale=0.5, max_frames=None):
+    """Render each trajectory and save it; with several, output names get an _<n> suffix"""
+    check_format(output)
+    game = MarioGame(headless=True, quiet=True)
+    fps = FPS / every
+    base, ext = os.path.splitext(output)
+    written = []
+    for n, trajectory in enumerate(trajectories):
+        filename = output if len(trajectories) == 1 else f"{base}_{n}{ext}"
+        frames = render_frames(trajectory, every, scale, max_frames, game)
+        save_frames(frames, filename, fps)
+        print(f" {filename}: {len(frames)} frames ({'WIN' if trajectory.win else 'LOSE'}, score {trajectory.score})")
+        written.append(filename)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export Mario episodes to GIF/PNG/video without a display")
+    parser.add_argument('output', help="output file: .gif (needs Pillow), .png strip, .y4m or .npy")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--model', default='q_table.qtb',
+                        help="Q-table or .pol policy to play greedily (default q_table.qtb)")
+    source.add_argument('--traj', help="export recorded episodes from this trajectory file instead")
+    parser.add_argument('-e', '--episodes', type=int, nargs='+',
+                        help="trajectory episode indices, or with --model a single count of episodes to play")
+    parser.add_argument('--seed', type=int, help="level layout seed when playing a model")
+    parser.add_argument('--level', type=int, default=CLASSIC_LEVEL,
+                        help="level id when playing a model (0 = classic, 1-3 procedural)")
+    parser.add_argument('--patterns', type=int, metavar='N',
+                        help="procedural level length in obstacle patterns when playing a model (default LEVEL_PARAMS)")
+    parser.add_argument('--every', type=int, default=2, help="keep every Nth frame (default 2)")
+    parser.add_argument('--scale', type=float, default=0.5, help="downscale factor (default 0.5)")
+    parser.add_argument('--max-frames', type=int, help="stop each clip after this many frames")
+    args = parser.parse_args(argv)
+
+    try:
+        check_format(args.output)
+    except (ValueError, RuntimeError) as e:
+        print(f" {e}")
+        sys.exit(1)
+
+    if args.traj:
+        with TrajectoryReader(args.traj) as reader:
+            trajectories = [reader[i] for i in (args.episodes or range(len(reader)))]
+    else:
+        from mario_policy import load_policy
+        model_file = args.model
+        if not os.path.exists(model_file) and os.path.exists("q_table.json"):
+            model_file = "q_table.json"
+        trajectories = record_policy(load_policy(model_file), args.episodes[0] if args.episodes else 1, args.seed,
+                                     args.level, args.patterns)
+
+    export_video(trajectories, args.output, args.every, args.scale, args.max_frames)
+
+
+if __name__ == "__main__":
+    main()
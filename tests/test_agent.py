@@ -0,0 +1,52 @@
+import pytest
+from mario_agent import QLearningAgent
+
+
+class ChainGame:
+    """Five encoded states walked left to right whatever the action; the last step pays 10"""
+
+    def reset(self):
+        self.state = 0
+        self.score = self.coins_collected = self.total_coins = self.time_taken = 0
+        self.win = False
+        return self.state
+
+    def step(self, action):
+        self.state += 1
+        done = self.state == 5
+        self.win = done
+        return self.state, 10.0 if done else 0.0, done
+
+
+def _trace_agent(actions, q_values):
+    agent = QLearningAgent(seed=0, trace_lambda=0.5)
+    for (state, action), value in q_values.items():
+        agent.q_table[state, action] = value
+    agent.get_action = lambda state, explore=True: actions[state]
+    agent.run_episode(ChainGame())
+    return agent
+
+
+def test_trace_carries_reward_back_along_greedy_actions():
+    agent = _trace_agent([2, 2, 2, 2, 2], {})
+    step = agent.learning_rate * 10
+    decay = agent.discount_factor * agent.trace_lambda
+    for state in range(5):
+        assert agent.q_table[state, 2] == pytest.approx(step * decay ** (4 - state))
+
+
+def test_trace_is_cut_after_an_exploratory_action():
+    # Action 2 is greedy in state 2, so taking action 0 there explores
+    agent = _trace_agent([2, 2, 0, 2, 2], {(2, 2): 1.0})
+    step = agent.learning_rate * 10
+    discount = agent.discount_factor
+    decay = discount * agent.trace_lambda
+
+    # The exploratory pair and everything after it share the final reward...
+    assert agent.q_table[4, 2] == pytest.approx(step)
+    assert agent.q_table[3, 2] == pytest.approx(step * decay)
+    assert agent.q_table[2, 0] == pytest.approx(step * decay ** 2)
+    # ...but the pairs before it only keep what they learned from bootstrapping on Q(2, 2)
+    bootstrap = agent.learning_rate * discount * 1.0
+    assert agent.q_table[1, 2] == pytest.approx(bootstrap)
+    assert agent.q_table[0, 2] == pytest.approx(bootstrap * decay)
@@ -0,0 +1,87 @@
+import json
+import numpy as np
+from mario_config import *
+from mario_checkpoint import MAGIC, _FIXED_V1, _schema, load_checkpoint, load_legacy_json, save_checkpoint
+from mario_state import NUM_STATES, encode_state
+
+
+def _tables(seed=0):
+    rng = np.random.default_rng(seed)
+    q_table = rng.normal(size=(NUM_STATES, NUM_ACTIONS))
+    action_counts = rng.integers(0, 1000, size=(NUM_STATES, NUM_ACTIONS))
+    visited = rng.random(NUM_STATES) < 0.3
+    return q_table, action_counts, visited
+
+
+def test_round_trip(tmp_path):
+    q_table, action_counts, visited = _tables()
+    action_counts[0, 0] = 2**40  # saturates instead of wrapping
+    path = str(tmp_path / 'q.qtb')
+    save_checkpoint(path, q_table, action_counts, visited, 0.25)
+
+    for mmap in (True, False):
+        checkpoint = load_checkpoint(path, mmap=mmap)
+        assert np.array_equal(checkpoint.q_table, q_table)
+        assert checkpoint.action_counts[0, 0] == 2**32 - 1
+        assert np.array_equal(checkpoint.action_counts.reshape(-1)[1:], action_counts.reshape(-1)[1:])
+        assert np.array_equal(checkpoint.visited, visited)
+        assert checkpoint.epsilon == 0.25
+
+
+def test_round_trip_without_counts(tmp_path):
+    q_table, _, visited = _tables()
+    path = str(tmp_path / 'q.qtb')
+    save_checkpoint(path, q_table, None, visited, 0.1)
+    checkpoint = load_checkpoint(path)
+    assert np.array_equal(checkpoint.q_table, q_table)
+    assert not checkpoint.action_counts.any()
+
+
+def test_loads_version_1(tmp_path):
+    q_table, action_counts, visited = _tables(1)
+    schema = _schema()
+    header_len = -(-(_FIXED_V1.size + len(schema)) // 64) * 64
+    path = tmp_path / 'v1.qtb'
+    with open(path, 'wb') as f:
+        f.write(_FIXED_V1.pack(MAGIC, 1, header_len, NUM_STATES, NUM_ACTIONS, 0.5, len(schema)))
+        f.write(schema + b'\0' * (header_len - _FIXED_V1.size - len(schema)))
+        f.write(q_table.astype('<f8').tobytes())
+        f.write(action_counts.astype('<i8').tobytes())
+        f.write(visited.astype(np.uint8).tobytes())
+
+    checkpoint = load_checkpoint(str(path))
+    assert np.array_equal(checkpoint.q_table, q_table)
+    assert np.array_equal(checkpoint.action_counts, action_counts)
+    assert np.array_equal(checkpoint.visited, visited)
+    assert checkpoint.epsilon == 0.5
+
+
+def test_legacy_json_merges_obstacle_width(tmp_path):
+    path = tmp_path / 'old.json'
+    data = {
+        'q_table': {
+            '(1, 2, 0, 0, 0)': [1.0, 0, 0, 0, 0, 0],   # narrow pit
+            '(1, 2, 0, 0, 1)': [4.0, 0, 0, 0, 0, 2.0],  # wide pit
+            '(4, 3, 0, 0, 1)': [0, 5.0, 0, 0, 0, 0],    # enemies are always "wide"
+            '(0, 1, 2, 3, 4, 5)': [0, 0, 0, 0, 0, 0],   # nonsense: skipped
+        },
+        'action_counts': {
+            '(1, 2, 0, 0, 0)': [3, 0, 0, 0, 0, 0],
+            '(1, 2, 0, 0, 1)': [1, 0, 0, 0, 0, 0],
+            '(4, 3, 0, 0, 1)': [0, 7, 0, 0, 0, 0],
+        },
+        'epsilon': 0.2
+    }
+    path.write_text(json.dumps(data))
+    checkpoint, skipped = load_legacy_json(str(path))
+
+    assert skipped == 1
+    coin_states = [(d, h) for d in STATE_SPACE['coin_distance'] for h in STATE_SPACE['coin_height']]
+    for coin in coin_states:
+        pit = encode_state((1, 2, 0, 0) + coin)
+        # Action 0 weighted by counts (3 x 1.0 + 1 x 4.0) / 4; action 5 never visited: plain mean
+        assert np.allclose(checkpoint.q_table[pit], [1.75, 0, 0, 0, 0, 1.0])
+        assert list(checkpoint.action_counts[pit]) == [4, 0, 0, 0, 0, 0]
+        assert checkpoint.q_table[encode_state((4, 3, 0, 0) + coin), 1] == 5.0
+    assert checkpoint.visited.sum() == 2 * len(coin_states)
+    assert checkpoint.epsilon == 0.2
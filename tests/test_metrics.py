@@ -0,0 +1,30 @@
+import random
+import pytest
+from mario_metrics import RollingMetrics, RollingWindow
+
+
+def test_rolling_window_after_wrapping():
+    rng = random.Random(0)
+    window = RollingWindow(7)
+    values = []
+    assert window.mean() == 0.0
+    # Several wraps, checked at every position in the ring
+    for _ in range(40):
+        values.append(rng.uniform(-100, 100))
+        window.append(values[-1])
+        recent = values[-7:]
+        assert len(window) == len(recent)
+        assert window.mean() == pytest.approx(sum(recent) / len(recent))
+
+
+def test_rolling_metrics_windows():
+    metrics = RollingMetrics(window=4, progress_window=2)
+    for episode in range(10):
+        metrics.add(episode % 3 == 0, episode * 10, episode, episode * 5, episode / 2)
+
+    # Long window holds episodes 6..9 (wins at 6 and 9), short one holds 8..9
+    assert metrics.win_rate() == 0.5
+    assert metrics.mean('score') == 75
+    assert metrics.progress_mean('score') == 85
+    assert metrics.progress_mean('win') == 0.5
+    assert metrics.mean('time') == pytest.approx(3.75)
@@ -0,0 +1,43 @@
+import itertools
+import numpy as np
+from mario_config import *
+from mario_agent import QLearningAgent
+from mario_policy import TIE_BREAK_ORDER, FrozenPolicy, compile_q_table
+from mario_sim import MarioSim
+from mario_state import NUM_STATES
+
+
+def test_evaluate_leaves_visit_counts_alone():
+    agent = QLearningAgent(seed=0)
+    agent.q_table[:, 2] = 1.0
+    counts, visited = agent.action_counts.copy(), agent.visited.copy()
+
+    results = agent.evaluate(MarioSim(quiet=True, encode_states=True, seed=0), 3)
+
+    assert results['episodes'] == 3
+    assert np.array_equal(agent.action_counts, counts)
+    assert np.array_equal(agent.visited, visited)
+
+
+def test_compile_breaks_ties_by_tie_break_order():
+    rng = np.random.default_rng(0)
+    q_table = rng.normal(size=(NUM_STATES, NUM_ACTIONS))
+    # The first rows tie every non-empty set of actions at the top
+    ties = [tied for size in range(1, NUM_ACTIONS + 1) for tied in itertools.combinations(range(NUM_ACTIONS), size)]
+    for row, tied in enumerate(ties):
+        q_table[row] = -1.0
+        q_table[row, list(tied)] = 0.5
+
+    actions = compile_q_table(q_table)
+
+    for row, tied in enumerate(ties):
+        assert actions[row] == min(tied, key=TIE_BREAK_ORDER.index)
+    assert np.array_equal(actions[len(ties):], q_table[len(ties):].argmax(axis=1))
+    assert actions.dtype == np.uint8
+
+
+def test_policy_file_round_trip(tmp_path):
+    q_table = np.random.default_rng(1).normal(size=(NUM_STATES, NUM_ACTIONS))
+    path = str(tmp_path / 'greedy.pol')
+    FrozenPolicy.from_q_table(q_table).save(path)
+    assert np.array_equal(FrozenPolicy.load(path).actions, compile_q_table(q_table))
@@ -0,0 +1,38 @@
+import struct
+from mario_sim import MarioSim
+from mario_replay import MAGIC, TrajectoryReader, TrajectoryWriter, verify
+
+
+def test_record_and_replay_episode_longer_than_uint16(tmp_path):
+    # Standing still on a 1200-pattern level runs until its (long) step limit
+    game = MarioSim(quiet=True, level_id=1, level_seed=0, num_patterns=1200, encode_states=True)
+    path = str(tmp_path / 'long.traj')
+    with TrajectoryWriter(path, record_states=True, record_rewards=True) as writer:
+        state = game.reset()
+        writer.begin(game, state)
+        done = False
+        while not done:
+            state, reward, done = game.step(0)
+            writer.step(0, state, reward)
+        writer.end()
+
+    with TrajectoryReader(path) as reader:
+        assert len(reader) == 1
+        trajectory = reader[0]
+        assert len(trajectory) == game.steps > 0xFFFF
+        assert trajectory.num_patterns == 1200
+        assert verify(trajectory) is None
+
+
+def test_reads_version_2_files(tmp_path):
+    path = tmp_path / 'v2.traj'
+    actions = bytes([2, 2, 4, 0])
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<8sI', MAGIC, 2))
+        f.write(struct.pack('<IHQIHBBi', 7, 1, 123, 0, len(actions), 0, 0, 15))
+        f.write(actions)
+
+    with TrajectoryReader(str(path)) as reader:
+        trajectory = reader[0]
+        assert (trajectory.episode, trajectory.level_id, trajectory.level_seed) == (7, 1, 123)
+        assert bytes(trajectory.actions) == actions and trajectory.score == 15
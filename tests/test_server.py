@@ -0,0 +1,22 @@
+import multiprocessing
+import numpy as np
+from mario_agent import QLearningAgent
+from mario_server import PolicyClient, _serve_in_background
+
+
+def test_background_server_starts_under_spawn(tmp_path, monkeypatch):
+    # spawn pickles the Process target, so it has to be a module-level function
+    monkeypatch.setattr(multiprocessing, 'Process', multiprocessing.get_context('spawn').Process)
+    agent = QLearningAgent(seed=0)
+    agent.q_table[:] = np.random.default_rng(0).random(agent.q_table.shape)
+    model = str(tmp_path / 'q.qtb')
+    agent.save_q_table(model)
+    socket_path = str(tmp_path / 'policy.sock')
+
+    proc = _serve_in_background(model, socket_path)
+    try:
+        with PolicyClient(socket_path) as client:
+            assert client.get_actions([0, 1, 2]) == [int(np.argmax(agent.q_table[s])) for s in (0, 1, 2)]
+    finally:
+        proc.terminate()
+        proc.join()
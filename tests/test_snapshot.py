@@ -0,0 +1,66 @@
+import random
+import pytest
+from mario_config import *
+from mario_sim import MarioSim
+from mario_vec_env import VectorMarioEnv
+
+
+def _play(sim, actions):
+    trace = []
+    for action in actions:
+        state, reward, done = sim.step(action)
+        trace.append((state, reward, done, sim.score, sim.coins_collected, sim.player_x, sim.player_y))
+        if done:
+            break
+    return trace
+
+
+def test_restore_snapshot_replays_identically():
+    rng = random.Random(2)
+    actions = [rng.choice((2, 2, 4, 3, 0, 1)) for _ in range(MAX_STEPS)]
+    sim = MarioSim(quiet=True, level_id=1, level_seed=6, encode_states=True)
+    sim.reset()
+    _play(sim, actions[:150])
+    assert sim.coins_collected > 0 and not sim.game_over
+    snapshot = sim.get_snapshot()
+    state = sim._get_state()
+    expected = _play(sim, actions[150:])
+
+    # Same sim after the episode ended, and a fresh sim that was on another level
+    other = MarioSim(quiet=True, level_id=3, level_seed=1, encode_states=True)
+    other.reset()
+    _play(other, [4] * 25)
+    for target in (sim, other):
+        assert target.restore_snapshot(snapshot) == state
+        assert target.get_snapshot() == snapshot
+        assert _play(target, actions[150:]) == expected
+
+    # The snapshot isn't changed by playing on from it
+    assert sim.restore_snapshot(snapshot) == state
+    assert _play(sim, actions[150:]) == expected
+
+
+def test_vector_env_restores_a_sim_snapshot():
+    rng = random.Random(5)
+    actions = [rng.choice((2, 4, 3)) for _ in range(MAX_STEPS)]
+    sim = MarioSim(quiet=True, level_id=2, level_seed=3, encode_states=True)
+    sim.reset()
+    _play(sim, actions[:70])
+    assert sim.coins_collected > 0 and not sim.game_over
+    snapshot = sim.get_snapshot()
+    state = sim._get_state()
+    expected = _play(sim, actions[70:])
+
+    envs = VectorMarioEnv(3, level_id=CLASSIC_LEVEL, level_seed=0, encode_states=True)
+    envs.reset()
+    states = envs.restore_snapshot([0, 2], snapshot)
+    assert states[0] == states[2] == state
+    for action, (state, reward, done, score, *_) in zip(actions[70:], expected):
+        states, rewards, dones = envs.step([action] * envs.num_envs)
+        for i in (0, 2):
+            assert bool(dones[i]) == done
+            assert rewards[i] == pytest.approx(reward)
+            if done:
+                assert envs.final_info['score'][i] == score
+            else:
+                assert states[i] == state
@@ -0,0 +1,101 @@
+import pygame
+from mario_config import *
+from mario_level import get_level
+from mario_sprites import LevelBackground, SpriteCache
+
+
+def test_background_tiles_stay_bounded_on_long_level():
+    pygame.init()
+    level = get_level(3, 0, quiet=True, num_patterns=100 * LEVEL_PARAMS[3]['num_patterns'])
+    background = LevelBackground(level, SpriteCache())
+    screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+    for camera_x in range(0, int(level.goal_x), PLAYER_SPEED * 40):
+        background.draw(screen, camera_x)
+        assert len(background._chunks) <= background.max_chunks
+
+    assert level.goal_x > 50 * SCREEN_WIDTH
+    # Scrolling back a little reuses tiles that are still cached
+    cached = set(background._chunks)
+    background.draw(screen, int(level.goal_x) - SCREEN_WIDTH * 2)
+    assert set(background._chunks) == cached
+
+
+def _reference_frame(game):
+    """The frame drawn primitive by primitive, as render() did before sprites and tiles were cached
+
+    Two documented differences are built in: coins are drawn above the static
+    scenery, and primitives are drawn on a canvas wider than the screen, so
+    the grass and pit lines at the screen edges aren't cut short by clipping.
+    """
+    from mario_sprites import draw_brick_block, draw_cloud, draw_coin, draw_enemy, draw_flag, draw_player, draw_spike
+    margin = 32
+    canvas = pygame.Surface((SCREEN_WIDTH + 2 * margin, SCREEN_HEIGHT))
+    level = game.level
+    colors = LEVEL_COLORS.get(level.level_id, {})
+    camera_x = game.camera_x - margin
+
+    canvas.fill(colors.get('sky', SKY_COLOR))
+    for i in range(5):
+        cloud_x = (i * 300 - int(game.camera_x * 0.5)) % (SCREEN_WIDTH + 200)
+        draw_cloud(canvas, cloud_x + margin, 50 + i * 30)
+    pygame.draw.rect(canvas, colors.get('ground', GROUND_COLOR), (0, GROUND_Y, canvas.get_width(), SCREEN_HEIGHT - GROUND_Y))
+    for i in range(0, canvas.get_width() + 20, 20):
+        grass_x = i - int(camera_x) % 20
+        pygame.draw.line(canvas, (50, 150, 50), (grass_x, GROUND_Y), (grass_x, GROUND_Y - 8), 2)
+
+    for obs in game.obstacles:
+        screen_x = obs['x'] - camera_x
+        if obs['type'] == 'pit':
+            pygame.draw.rect(canvas, PIT_COLOR, (screen_x, GROUND_Y, obs['width'], SCREEN_HEIGHT - GROUND_Y))
+            for j in range(0, obs['width'], 10):
+                pygame.draw.line(canvas, (50, 50, 50), (screen_x + j, GROUND_Y), (screen_x + j + 5, GROUND_Y + 10), 2)
+        elif obs['type'] == 'block':
+            draw_brick_block(canvas, screen_x, obs['y'], obs['width'], obs['height'])
+        elif obs['type'] == 'spike':
+            draw_spike(canvas, screen_x, obs['y'], obs['width'], obs['height'])
+    goal_x = game.goal_x - camera_x
+    draw_flag(canvas, goal_x, GROUND_Y - 80)
+    pygame.draw.rect(canvas, (255, 215, 0), (goal_x - 30, GROUND_Y - 100, 60, 100), 3)
+
+    for i in range(level.num_coins):
+        if not game.coin_collected[i]:
+            draw_coin(canvas, level.coin_x[i] - camera_x, level.coin_y[i])
+    for obs in game.obstacles:
+        if obs['type'] == 'enemy':
+            draw_enemy(canvas, obs['x'] - camera_x, obs['y'], obs['radius'])
+    draw_player(canvas, game.player_x - camera_x, game.player_y)
+
+    frame = canvas.subsurface((margin, 0, SCREEN_WIDTH, SCREEN_HEIGHT)).copy()
+    font = pygame.font.Font(None, 32)
+    coin_pct = (game.coins_collected * 100 // game.total_coins) if game.total_coins > 0 else 0
+    best_time = f"{game.best_time:.1f}" if game.best_time != float('inf') else "--"
+    lines = [f"Score: {game.score} | Coins: {game.coins_collected}/{game.total_coins} ({coin_pct}%)",
+             f"Time: {game.time_taken:.1f}s | Best: {best_time}s",
+             f"Distance: {int(game.max_x)}/{int(game.goal_x)}"]
+    for i, text in enumerate(lines):
+        frame.blit(font.render(text, True, (0, 0, 0)), (12, 12 + 30 * i))
+        frame.blit(font.render(text, True, (255, 255, 255)), (10, 10 + 30 * i))
+    return frame
+
+
+def test_cached_renderer_matches_direct_drawing():
+    from mario_env import MarioGame
+    pygame.init()
+    screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    for level_id, seed in ((CLASSIC_LEVEL, 3), (3, 1)):
+        game = MarioGame(headless=True, quiet=True, level_id=level_id, seed=seed)
+        game.reset()
+        # Scroll across the whole level (every tile seam) and play a few real steps
+        for camera_x in range(0, int(game.goal_x), 97):
+            game.camera_x = float(camera_x)
+            game.player_x = camera_x + 300.0
+            game.draw(screen)
+            assert pygame.image.tobytes(screen, 'RGB') == pygame.image.tobytes(_reference_frame(game), 'RGB'), camera_x
+        game.reset()
+        for step in range(60):
+            game.step(4 if step % 9 == 0 else 2)
+            if game.game_over or game.win:
+                break
+            game.draw(screen)
+            assert pygame.image.tobytes(screen, 'RGB') == pygame.image.tobytes(_reference_frame(game), 'RGB'), step
@@ -0,0 +1,43 @@
+import numpy as np
+from mario_stats import STATS_DTYPE, StatsWriter, load_stats
+
+
+def _record(episode):
+    return {
+        'episode': episode, 'reward': episode * 1.5 - 10, 'steps': 100 + episode, 'score': -episode,
+        'time': episode / 3, 'coins': episode % 7, 'total_coins': 7, 'coin_pct': (episode % 7) / 7 * 100,
+        'win': episode % 2, 'perfect': episode % 7 == 6, 'epsilon': 1 / (episode + 1), 'win_rate': episode / 50,
+    }
+
+
+def test_writer_round_trip(tmp_path):
+    path = str(tmp_path / 'stats.bin')
+    # 23 records with flush_every=5: four full flushes plus a partial one on close
+    with StatsWriter(path, flush_every=5) as writer:
+        for episode in range(23):
+            writer.write(_record(episode))
+
+    stats = load_stats(path)
+    assert set(stats) == set(STATS_DTYPE.names)
+    for name in STATS_DTYPE.names:
+        expected = np.array([_record(episode)[name] for episode in range(23)], dtype=STATS_DTYPE[name])
+        assert np.array_equal(stats[name], expected)
+
+
+def test_load_stats_while_writing(tmp_path):
+    path = str(tmp_path / 'stats.bin')
+    writer = StatsWriter(path, flush_every=4)
+    assert all(len(column) == 0 for column in load_stats(path).values())
+
+    for episode in range(6):
+        writer.write(_record(episode))
+    # Only flushed records are on disk so far
+    assert list(load_stats(path)['episode']) == [0, 1, 2, 3]
+
+    writer.close()
+    assert list(load_stats(path)['episode']) == list(range(6))
+
+    # A torn last record is ignored
+    with open(path, 'ab') as f:
+        f.write(b'\0' * (STATS_DTYPE.itemsize // 2))
+    assert len(load_stats(path)['episode']) == 6
@@ -0,0 +1,69 @@
+import json
+import os
+import pytest
+from mario_agent import QLearningAgent
+from mario_curriculum import CurriculumTrainer
+from mario_hogwild import HogwildTrainer
+from mario_parallel import ParallelTrainer
+from mario_stats import INTERRUPTED, TrainingStats
+
+
+def _interrupt_after(monkeypatch, owner, name, calls):
+    """Make call number calls + 1 of owner.name raise KeyboardInterrupt, as one Ctrl+C would"""
+    original = getattr(owner, name)
+    count = [0]
+
+    def wrapper(*args, **kwargs):
+        count[0] += 1
+        if count[0] == calls + 1:
+            raise KeyboardInterrupt
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(owner, name, wrapper)
+
+
+def test_interrupted_curriculum_saves_and_stops(tmp_path, monkeypatch):
+    _interrupt_after(monkeypatch, QLearningAgent, 'run_episode', 5)
+    output = str(tmp_path / 'q.qtb')
+    stats_file = str(tmp_path / 'stats.bin')
+    trainer = CurriculumTrainer(QLearningAgent(seed=0), episodes_per_level=20, seed=0,
+                                output=output, stats_file=stats_file)
+    results = trainer.train()
+
+    assert [r['level_id'] for r in results] == [1]
+    assert results[0]['stop_reason'] == INTERRUPTED
+    assert results[0]['total_episodes'] == 5
+    assert os.path.exists(str(tmp_path / 'q_level1.qtb'))
+    assert not os.path.exists(str(tmp_path / 'q_level2.qtb'))
+    assert os.path.exists(output)
+    with open(str(tmp_path / 'stats_all_levels.json')) as f:
+        assert json.load(f)[0]['stop_reason'] == INTERRUPTED
+
+
+def test_interrupted_parallel_training_stops(monkeypatch):
+    _interrupt_after(monkeypatch, TrainingStats, 'record', 6)
+    agent = QLearningAgent(seed=0)
+    stats = ParallelTrainer(agent, num_workers=2, sync_every=2, seed=0).train(40)
+
+    assert stats['stop_reason'] == INTERRUPTED
+    assert stats['total_episodes'] == 6
+    assert agent.num_visited_states > 0
+
+
+def test_interrupted_hogwild_training_stops(monkeypatch):
+    _interrupt_after(monkeypatch, TrainingStats, 'record', 3)
+    agent = QLearningAgent(seed=0)
+    stats = HogwildTrainer(agent, num_workers=2, seed=0).train(1000)
+
+    assert stats['stop_reason'] == INTERRUPTED
+    # Workers finish the episodes they had started, so a few more may be logged
+    assert stats['total_episodes'] < 20
+    assert agent.num_visited_states > 0
+
+
+def test_hogwild_needs_several_workers(capsys):
+    import main
+    with pytest.raises(SystemExit) as exit_info:
+        main.main(['train', '--hogwild', '-w', '1'])
+    assert exit_info.value.code == 2
+    assert '--hogwild needs at least 2 workers' in capsys.readouterr().out
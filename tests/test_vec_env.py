@@ -0,0 +1,41 @@
+import random
+import numpy as np
+from mario_config import *
+from mario_sim import MarioSim
+from mario_vec_env import VectorMarioEnv
+
+
+def test_vector_env_matches_mario_sim():
+    # A one-pattern level is short enough for scripted runs to win
+    for level_id, level_seed, num_patterns in ((CLASSIC_LEVEL, 0, None), (1, 3, None), (3, 5, None), (2, 0, 1)):
+        envs = VectorMarioEnv(4, level_id=level_id, level_seed=level_seed, encode_states=True,
+                              num_patterns=num_patterns)
+        sims = [MarioSim(quiet=True, level_id=level_id, level_seed=level_seed, encode_states=True,
+                         num_patterns=num_patterns) for _ in range(envs.num_envs)]
+        states = envs.reset()
+        assert list(states) == [sim.reset() for sim in sims]
+
+        # Random mostly-forward play, always right+jump, and standing still until the timeout
+        rng = random.Random(level_id)
+        policies = [lambda: rng.choice((2, 2, 4, 3, 0, 1)), lambda: 4, lambda: 0, lambda: rng.choice((2, 4))]
+        running = np.ones(envs.num_envs, dtype=bool)
+        while running.any():
+            actions = [policy() for policy in policies]
+            states, rewards, dones = envs.step(actions)
+            for i in np.flatnonzero(running):
+                state, reward, done = sims[i].step(actions[i])
+                assert bool(dones[i]) == done
+                assert np.isclose(rewards[i], reward)
+                if done:
+                    running[i] = False
+                    assert envs.final_info['win'][i] == sims[i].win
+                    assert envs.final_info['score'][i] == sims[i].score
+                    assert envs.final_info['steps'][i] == sims[i].steps
+                    # Finished envs restart right away
+                    assert states[i] == sims[i].reset()
+                else:
+                    assert states[i] == state
+
+        assert envs.final_info['steps'][2] == MAX_STEPS + 1
+        if num_patterns == 1:
+            assert envs.final_info['win'][1]
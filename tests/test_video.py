@@ -0,0 +1,29 @@
+import numpy as np
+from mario_config import *
+from mario_agent import QLearningAgent
+from mario_video import frame_size, record_policy
+
+
+def _runner():
+    agent = QLearningAgent(seed=0)
+    agent.q_table[:, 2] = 1.0  # always run right
+    return agent
+
+
+def test_record_policy_on_a_procedural_level():
+    trajectories = record_policy(_runner().freeze(), episodes=2, level_seed=4, level_id=2, num_patterns=3)
+    assert [(t.level_id, t.level_seed, t.num_patterns) for t in trajectories] == [(2, 4, 3), (2, 4, 3)]
+    assert len(trajectories[0]) > 0
+
+
+def test_video_subcommand(tmp_path):
+    import main
+    model = str(tmp_path / 'q.qtb')
+    _runner().save_q_table(model)
+    output = str(tmp_path / 'clip.npy')
+
+    main.main(['video', output, '--model', model, '--level', '1', '--patterns', '2', '--seed', '7',
+               '--every', '20', '--scale', '0.25', '--max-frames', '3'])
+
+    width, height = frame_size(0.25)
+    assert np.load(output).shape == (3, height, width, 3)